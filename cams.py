@@ -1,17 +1,40 @@
 import time
-import pandas as pd
-import openpyxl
+
+STARTED = time.perf_counter()
+
+import argparse
+import collections
+import functools
+import logging
+import socket
+import sys
+import threading
 from datetime import datetime
-from openpyxl.styles import numbers
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+from selenium.common.exceptions import TimeoutException
 from dotenv import load_dotenv
-import os 
+import os
+
+from cams_artifacts import DEFAULT_ARTIFACT_DIR, DEFAULT_MAX_COUNT, DEFAULT_MAX_MB, ArtifactWriter
+from cams_cookies import DEFAULT_COOKIE_PATH, CookieStore
+from cams_driver import DEFAULT_DRIVER_CACHE, resolve_driver
+from cams_cache import DEFAULT_CACHE_PATH, DEFAULT_MAX_ACCOUNTS, ResultCache
+from cams_input import AccountSource
+from cams_journal import Journal, default_journal_path
+from cams_output import DEFAULT_SQLITE_PATH, CsvWriter, ParquetWriter, SqliteSink, TemplateWriter
+from cams_recycle import DEFAULT_HANG_TIMEOUT, DEFAULT_MAX_RSS_MB, DEFAULT_RECYCLE_EVERY, Recycler, browser_rss_mb, kill_browser
+from cams_retry import MAX_RETRIES, Pacer, WorkQueue
+from cams_selectors import DEFAULT_STATS_PATH, SelectorRegistry
+from cams_telemetry import LOG_LEVELS, configure as configure_logging, emit, log
+
+# WebDriverWait and expected_conditions pull in Selenium's whole remote
+# WebDriver stack, a third of a second before anything happens. Only
+# browser sessions need them, so import_selenium() loads them when the
+# first driver is created; the HTTP backend and the coordinator never do.
+webdriver = Service = WebDriverWait = EC = None
+
+IMPORTED = time.perf_counter()
 
 load_dotenv()
 
@@ -24,534 +47,1532 @@ timestamp = now.strftime("(%m-%d-%Y)_%I%M%S %p")
 input_excel = "account_numbers.xlsx"
 template_path = "(TEMPLATE).xlsx"
 
+BROWSER_PROFILES = ["full", "lean"]
 
-options = Options()
-options.add_argument("--start-maximized")
-options.add_argument("--ignore-certificate-errors")
-options.add_argument("--ignore-ssl-errors")
-options.add_argument("--disable-blink-features=AutomationControlled")
-options.add_experimental_option("excludeSwitches", ["enable-automation"])
-options.add_experimental_option('useAutomationExtension', False)
-
-driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-wait = WebDriverWait(driver, 10)
-
-print("Opening login page...")
-driver.get(CAMS_URL)
-
-try:
-    print("Waiting for login form...")
-    username_field = wait.until(EC.presence_of_element_located((By.ID, "LoginID")))
-    password_field = driver.find_element(By.ID, "txtPassword")
-    login_button = driver.find_element(By.ID, "cmdLogin")
-    
-    print("Entering credentials...")
-    username_field.clear()
-    username_field.send_keys(USERNAME)
-    password_field.clear()
-    password_field.send_keys(PASSWORD)
-    
-    print("Logging in...")
-    login_button.click()
-
-    print("Waiting for login to process...")
-    time.sleep(2) 
-    
-    current_url = driver.current_url
-    page_source = driver.page_source
-    
-    if "login" in current_url.lower() or "error" in page_source.lower():
-        print(f"Login may have failed - still on: {current_url}")
-    
-    print(f"Checking for new tabs... Current handles: {len(driver.window_handles)}")
-    
-    for i in range(10):
-        if len(driver.window_handles) > 1:
-            print(f"New tab detected after {i+1} seconds!")
-            break
-        time.sleep(.5)
+# Output sinks --output can pick, any number at once.
+OUTPUT_FORMATS = ["xlsx", "csv", "parquet", "sqlite"]
+
+# How a browser session gets back to the search form between accounts:
+# through the app's own menu link inside the frameset, or a full reload.
+NAVIGATION_MODES = ["frame", "reload"]
+
+SEARCH_INPUT_ID = "_ctl0_ContentPlaceHolder1_txtSearch"
+
+# Seconds driver.get and form posts may take before the load is abandoned.
+PAGE_LOAD_TIMEOUT = 30
+
+# The lean profile's window and the asset URLs it refuses to download.
+LEAN_WINDOW_SIZE = "1280,800"
+LEAN_BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.bmp", "*.ico", "*.svg", "*.webp",
+    "*.css", "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+]
+
+# Account page element IDs and the output column each one feeds.
+ACCOUNT_FIELDS = {
+    "lblSHORTNAME": "ACCOUNT NAME",
+    "lblADDRESS": "PRIMARY ADDRESS",
+    "lblADDRESS2": "SECONDARY ADDRESS",
+    "lblOUT_BAL": "OB",
+    "txtREM_STAT": "REM STAT",
+    "lblAGESRC": "DPD",
+    "txtMobile": "MOBILE #",
+}
+
+# Collateral detail form element IDs and their output columns.
+VEHICLE_FIELDS = {
+    "txtColor_AUTO": "COLOR",
+    "txtPlateNum_AUTO": "PLATE #",
+    "txtSerialNo_AUTO": "SERIAL #",
+    "txtEngineNo_AUTO": "ENGINE #",
+    "txtUnitDesc_AUTO": "UNIT DESCRIPTION",
+}
+
+# Fallback locator cascades. The registry tries them in order of past wins,
+# so the declared order only matters until it has some history.
+RESULT_SELECTORS = [
+    (By.XPATH, "//td[contains(text(), '{acct}')]"),
+    (By.XPATH, "//tr[contains(., '{acct}')]"),
+    (By.XPATH, "//*[contains(text(), '{acct}')]"),
+]
+
+POPUP_OK_SELECTORS = [
+    (By.XPATH, "//button[text()='OK']"),
+    (By.XPATH, "//button[contains(text(), 'OK')]"),
+    (By.XPATH, "//input[@value='OK']"),
+    (By.ID, "OK"),
+    (By.CLASS_NAME, "ui-button"),
+    (By.XPATH, "//div[contains(@class, 'ui-dialog')]//button"),
+    (By.XPATH, "//button[contains(@class, 'ylin') and contains(text(), 'OK')]"),
+]
+
+ACCOUNT_DETAILS_SELECTORS = [
+    (By.PARTIAL_LINK_TEXT, "Account Details"),
+    (By.LINK_TEXT, "Account Details"),
+    (By.XPATH, "//a[contains(text(), 'Account Details')]"),
+    (By.XPATH, "//a[@class='dropdown-toggle' and contains(text(), 'Account Details')]"),
+    (By.CLASS_NAME, "dropdown-toggle"),
+]
+
+COLLATERAL_SELECTORS = [
+    (By.PARTIAL_LINK_TEXT, "Collateral"),
+    (By.LINK_TEXT, "Collateral"),
+    (By.XPATH, "//a[contains(text(), 'Collateral')]"),
+    (By.XPATH, "//a[contains(@href, 'accountcollateral.aspx')]"),
+    (By.XPATH, "//*[contains(text(), 'Collateral')]"),
+]
+
+VEHICLE_DETAIL_SELECTORS = [
+    (By.ID, "dg__ctl2_DetailLink"),
+    (By.ID, "DetailLink"),
+    (By.XPATH, "//a[contains(@id, 'DetailLink')]"),
+    (By.XPATH, "//a[contains(text(), 'Detail')]"),
+    (By.XPATH, "//a[contains(@id, 'dg_') and contains(@id, 'DetailLink')]"),
+]
+
+SEARCH_LINK_SELECTORS = [
+    (By.ID, "lnkSearch"),
+    (By.LINK_TEXT, "Search"),
+    (By.PARTIAL_LINK_TEXT, "Search"),
+    (By.XPATH, "//a[contains(@href, 'search')]"),
+]
+
+# Joins the values of accounts with several collateral units, in grid order.
+UNIT_SEPARATOR = " | "
+
+# Every column a record can carry, in the order the fallback workbook uses.
+RECORD_COLUMNS = [
+    "AGENT", "ENDO DATE", "PLACEMENT", "ACCOUNT NO", "ACCOUNT NAME", "PRIMARY ADDRESS",
+    "SECONDARY ADDRESS", "OB", "REM STAT", "DPD", "MOBILE #", "NEW_PULLOUT_DATE",
+    *VEHICLE_FIELDS.values(),
+]
+
+# Record statuses. Errors are retried; an account missing from the search
+# results is final.
+STATUS_SUCCESS = "Success"
+STATUS_NOT_FOUND = "Not Found"
+STATUS_ERROR = "Error"
+
+
+class SessionError(Exception):
+    """Raised when a browser session cannot reach the CAMS search page."""
+
+
+class StepTimer:
+    """Collects wall-clock seconds per named step, lap style.
+
+    `lap(step)` books the time since the previous lap (or `restart()`)
+    against `step`, so the account loop can time its phases without
+    re-indenting them. Since the last `restart()`, `trace` also lists the
+    laps in order and `notes` holds what `note()` recorded, such as the
+    selectors that matched, for the per-account event.
+    """
+
+    def __init__(self):
+        self.steps = {}
+        self.trace = []
+        self.notes = {}
+        self._mark = time.perf_counter()
+
+    def restart(self):
+        self._mark = time.perf_counter()
+        self.trace = []
+        self.notes = {}
+
+    def lap(self, step):
+        now = time.perf_counter()
+        self.steps.setdefault(step, []).append(now - self._mark)
+        self.trace.append({"step": step, "seconds": round(now - self._mark, 4)})
+        self._mark = now
+
+    def note(self, key, value):
+        self.notes[key] = value
+
+    def merge(self, other):
+        for step, durations in other.steps.items():
+            self.steps.setdefault(step, []).extend(durations)
+
+    def summary(self):
+        """{step: {"count", "total", "p50", "p95", "max"}} in seconds."""
+        return {
+            step: {
+                "count": len(durations),
+                "total": sum(durations),
+                "p50": percentile(durations, 50),
+                "p95": percentile(durations, 95),
+                "max": max(durations),
+            }
+            for step, durations in self.steps.items()
+        }
+
+    def report(self):
+        if not self.steps:
+            return
+        print("Step timings:")
+        print(f"  {'step':<16}{'count':>7}{'total s':>10}{'p50 s':>9}{'p95 s':>9}{'max s':>9}")
+        for step, stats in self.summary().items():
+            print(f"  {step:<16}{stats['count']:>7}{stats['total']:>10.2f}{stats['p50']:>9.2f}{stats['p95']:>9.2f}{stats['max']:>9.2f}")
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of `values`; 0.0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def wait_for_page_ready(driver, timeout=10):
+    """Block until the current document (or frame) has finished loading."""
+    WebDriverWait(driver, timeout).until(
+        lambda d: d.execute_script("return document.readyState") == "complete"
+    )
+
+
+def wait_for_navigation(driver, old_element, timeout=10):
+    """Wait for a postback to replace the page `old_element` lives on.
+
+    Returns False when the element never went stale, e.g. the click only
+    changed the page client-side.
+    """
+    try:
+        WebDriverWait(driver, timeout).until(EC.staleness_of(old_element))
+    except TimeoutException:
+        return False
+    wait_for_page_ready(driver, timeout)
+    return True
+
+
+def build_options(profile="full"):
+    """Chrome options for a browser profile.
+
+    "full" is the visible, maximized browser the script has always used.
+    "lean" runs headless at a small window size, skips images and
+    stylesheets and returns from driver.get at DOMContentLoaded, to cut
+    page latency and memory per session.
+    """
+    options = Options()
+    if profile == "lean":
+        options.add_argument("--headless=new")
+        options.add_argument(f"--window-size={LEAN_WINDOW_SIZE}")
+        options.add_argument("--blink-settings=imagesEnabled=false")
+        options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.managed_default_content_settings.stylesheets": 2,
+        })
+        options.page_load_strategy = "eager"
     else:
-        print("No new tab detected - login might have failed or uses different flow")
-        print("Trying direct navigation to cams")
-        driver.get("CAMS_URL")
-        time.sleep(1)
-        
-        if "cams.aspx" in driver.current_url:
-            print("Successfully accessed cams.aspx directly")
-        else:
-            print("Could not access main application page")
-            with open("access_failed_dump.html", "w", encoding="utf-8") as f:
-                f.write(driver.page_source)
-            driver.quit()
-            exit(1)
-    
-    if len(driver.window_handles) > 1:
-        print("Switching to new tab...")
-        driver.switch_to.window(driver.window_handles[-1])
-        time.sleep(1.5)
-        
-        print(f"New tab URL: {driver.current_url}")
-        print(f"New tab title: {driver.title}")
-        
-        if "cams.aspx" not in driver.current_url:
-            print("New tab is not the expected cams.aspx page")
-            print("Navigating to cams.aspx...")
+        options.add_argument("--start-maximized")
+    options.add_argument("--ignore-certificate-errors")
+    options.add_argument("--ignore-ssl-errors")
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option('useAutomationExtension', False)
+    return options
+
+
+def import_selenium():
+    global webdriver, Service, WebDriverWait, EC
+    if WebDriverWait is None:
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+
+
+def create_driver(profile="full", page_load_timeout=PAGE_LOAD_TIMEOUT, driver_path=None):
+    import_selenium()
+    driver = webdriver.Chrome(service=Service(driver_path or resolve_driver()), options=build_options(profile))
+    if page_load_timeout:
+        driver.set_page_load_timeout(page_load_timeout)
+    driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+    if profile == "lean":
+        block_assets(driver)
+    return driver
+
+
+def block_assets(driver):
+    """Block LEAN_BLOCKED_URLS in the window `driver` is on.
+
+    Content settings miss assets pulled in by scripts, so they are blocked
+    at the network layer too. The CDP commands only reach the current
+    window's DevTools target: call again after switching windows.
+    """
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": LEAN_BLOCKED_URLS})
+
+
+def emit_session_start(session):
+    """Log the start-up laps of a freshly started `session`, so the run metrics see login latency too."""
+    seconds = sum(step["seconds"] for step in session.timer.trace)
+    emit("session_start", f"[{session.label}] Session ready in {seconds:.2f}s", session=session.label,
+         seconds=round(seconds, 4), steps=session.timer.trace)
+
+
+def capture_failure(artifacts, driver, kind, acct=None, reason=None):
+    """Hand the page `driver` is on to the failure artifact writer, when there is one."""
+    if artifacts is not None:
+        artifacts.capture_page(driver, kind, acct, reason)
+
+
+def login(driver, wait, artifacts=None):
+    log.debug("Opening login page...")
+    driver.get(CAMS_URL)
+
+    try:
+        log.debug("Waiting for login form...")
+        username_field = wait.until(EC.presence_of_element_located((By.ID, "LoginID")))
+        password_field = driver.find_element(By.ID, "txtPassword")
+        login_button = driver.find_element(By.ID, "cmdLogin")
+
+        log.debug("Entering credentials...")
+        username_field.clear()
+        username_field.send_keys(USERNAME)
+        password_field.clear()
+        password_field.send_keys(PASSWORD)
+
+        log.debug("Logging in...")
+        login_button.click()
+
+        log.debug("Waiting for login to process...")
+        try:
+            wait.until(lambda d: len(d.window_handles) > 1 or EC.staleness_of(login_button)(d))
+        except TimeoutException:
+            pass
+
+        current_url = driver.current_url
+        page_source = driver.page_source
+
+        if "login" in current_url.lower() or "error" in page_source.lower():
+            log.warning(f"Login may have failed - still on: {current_url}")
+
+        log.debug(f"Checking for new tabs... Current handles: {len(driver.window_handles)}")
+
+        tab_wait_started = time.perf_counter()
+        try:
+            WebDriverWait(driver, 5, poll_frequency=.1).until(lambda d: len(d.window_handles) > 1)
+            log.debug(f"New tab detected after {time.perf_counter() - tab_wait_started:.1f} seconds!")
+        except TimeoutException:
+            log.warning("No new tab detected - login might have failed or uses different flow")
+            log.debug("Trying direct navigation to cams")
             driver.get(CAMS_URL)
-            time.sleep(1.25)
-    
-    print(f"✅ Ready to proceed - Current URL: {driver.current_url}")
-
-except Exception as e:
-    print(f"Login process error: {e}")
-    driver.save_screenshot("login_error.png")
-    driver.quit()
-    raise e
-
-try:
-    time.sleep(1.25)
-    
-    frames = driver.find_elements(By.TAG_NAME, "frame")
-    
-    for i, frame in enumerate(frames):
-        frame_name = frame.get_attribute("name")
-        frame_src = frame.get_attribute("src")
-        print(f"  Frame {i}: name='{frame_name}', src='{frame_src}'")
-    
-    print("Switching to SystemFrame...")
+            wait_for_page_ready(driver)
+
+            if "cams.aspx" in driver.current_url:
+                log.debug("Successfully accessed cams.aspx directly")
+            else:
+                log.warning("Could not access main application page")
+                capture_failure(artifacts, driver, "access_failed", reason="could not reach cams.aspx")
+                raise SessionError("Could not access main application page")
+
+        if len(driver.window_handles) > 1:
+            log.debug("Switching to new tab...")
+            driver.switch_to.window(driver.window_handles[-1])
+            wait.until(lambda d: d.current_url != "about:blank")
+            wait_for_page_ready(driver)
+
+            log.debug(f"New tab URL: {driver.current_url}")
+            log.debug(f"New tab title: {driver.title}")
+
+            if "cams.aspx" not in driver.current_url:
+                log.warning("New tab is not the expected cams.aspx page")
+                log.debug("Navigating to cams.aspx...")
+                driver.get(CAMS_URL)
+                wait_for_page_ready(driver)
+
+        log.info(f"✅ Ready to proceed - Current URL: {driver.current_url}")
+
+    except SessionError:
+        raise
+    except Exception as e:
+        log.error(f"Login process error: {e}")
+        capture_failure(artifacts, driver, "login_error", reason=type(e).__name__)
+        raise e
+
+
+def restore_session(driver, cookies):
+    """Load saved login cookies and reopen cams.aspx; True when CAMS shows SystemFrame again."""
+    # Cookies can only be set for the domain of the page that is open.
+    driver.get(CAMS_URL)
+    driver.delete_all_cookies()
+    for cookie in cookies:
+        try:
+            driver.add_cookie(cookie)
+        except Exception as e:
+            log.warning(f"Could not restore cookie {cookie.get('name')}: {e}")
+    driver.get(CAMS_URL)
     try:
-        driver.switch_to.frame("SystemFrame")
-        print("Successfully switched to SystemFrame by name")
-    except:
+        WebDriverWait(driver, 10, poll_frequency=.1).until(
+            lambda d: d.find_elements(By.NAME, "SystemFrame") or d.find_elements(By.ID, "LoginID"))
+    except TimeoutException:
+        return False
+    return bool(driver.find_elements(By.NAME, "SystemFrame"))
+
+
+def enter_system_frame(driver, wait, artifacts=None):
+    try:
+        wait.until(EC.presence_of_element_located((By.TAG_NAME, "frame")))
+
+        frames = driver.find_elements(By.TAG_NAME, "frame")
+
+        for i, frame in enumerate(frames):
+            frame_name = frame.get_attribute("name")
+            frame_src = frame.get_attribute("src")
+            log.debug(f"  Frame {i}: name='{frame_name}', src='{frame_src}'")
+
+        log.debug("Switching to SystemFrame...")
         try:
-            system_frame = driver.find_element(By.NAME, "SystemFrame")
-            driver.switch_to.frame(system_frame)
-            print("Successfully switched to SystemFrame by element")
+            driver.switch_to.frame("SystemFrame")
+            log.debug("Successfully switched to SystemFrame by name")
         except:
-            driver.switch_to.frame(len(frames) - 1)
-            print("Successfully switched to SystemFrame by index")
-    
-    time.sleep(1)
-    
-    print(f"Frame URL: {driver.current_url}")
-    print(f"Frame title: {driver.title}")
-    
-    print("Looking for search elements in SystemFrame...")
-
-except Exception as e:
-    print(f"Failed to access frames: {e}")
-    driver.save_screenshot("frame_error.png")
-    with open("frame_error.html", "w", encoding="utf-8") as f:
-        f.write(driver.page_source)
-    driver.quit()
-    raise e
-
-print("📊 Loading account numbers from Excel...")
-try:
-    accounts_df = pd.read_excel(input_excel, dtype={"Account No": str})
-    account_dict = accounts_df.set_index("Account No").to_dict("index")
-    account_numbers = list(account_dict.keys())
-    print(f"📋 Loaded {len(account_numbers)} account numbers")
-except Exception as e:
-    print(f"Error loading Excel file: {e}")
-    driver.quit()
-    raise e
-
-results = []
-
-print("Starting account processing...")
-
-print("Ensuring we're in the SystemFrame...")
-try:
-    driver.switch_to.default_content()
-    driver.switch_to.frame("SystemFrame")
-    print("Switched to SystemFrame for element checking")
-except Exception as e:
-    print(f"Frame switching warning: {e}")
-
-print("Checking if search elements are available in SystemFrame...")
-
-def check_element_exists(by, identifier, element_name):
+            try:
+                system_frame = driver.find_element(By.NAME, "SystemFrame")
+                driver.switch_to.frame(system_frame)
+                log.debug("Successfully switched to SystemFrame by element")
+            except:
+                driver.switch_to.frame(len(frames) - 1)
+                log.debug("Successfully switched to SystemFrame by index")
+
+        wait_for_page_ready(driver)
+
+        log.debug(f"Frame URL: {driver.current_url}")
+        log.debug(f"Frame title: {driver.title}")
+
+        log.debug("Looking for search elements in SystemFrame...")
+
+    except Exception as e:
+        log.error(f"Failed to access frames: {e}")
+        capture_failure(artifacts, driver, "frame_error", reason=type(e).__name__)
+        raise e
+
+
+def check_element_exists(driver, by, identifier, element_name):
     """Check if an element exists and return True/False with logging"""
     try:
         element = driver.find_element(by, identifier)
-        print(f"Found {element_name}: {identifier}")
+        log.debug(f"Found {element_name}: {identifier}")
         return True
     except:
-        print(f"Missing {element_name}: {identifier}")
+        log.warning(f"Missing {element_name}: {identifier}")
         return False
 
-search_elements_found = True
-if not check_element_exists(By.ID, "_ctl0_ContentPlaceHolder1_txtSearch", "Search Input"):
-    search_elements_found = False
-if not check_element_exists(By.ID, "_ctl0_ContentPlaceHolder1_btnSearch", "Search Button"):
-    search_elements_found = False
-
-if not search_elements_found:
-    print("Critical search elements not found. Saving page state for debugging...")
-    driver.save_screenshot("missing_search_elements.png")
-    with open("search_elements_missing.html", "w", encoding="utf-8") as f:
-        f.write(driver.page_source)
-    
-    print("Looking for alternative search elements...")
-    
-    all_inputs = driver.find_elements(By.TAG_NAME, "input")
-    print(f"Found {len(all_inputs)} input elements:")
-    for i, inp in enumerate(all_inputs[:10]):  
+
+def check_search_elements(driver, artifacts=None):
+    log.debug("Ensuring we're in the SystemFrame...")
+    try:
+        driver.switch_to.default_content()
+        driver.switch_to.frame("SystemFrame")
+        log.debug("Switched to SystemFrame for element checking")
+    except Exception as e:
+        log.warning(f"Frame switching warning: {e}")
+
+    log.debug("Checking if search elements are available in SystemFrame...")
+
+    search_elements_found = True
+    if not check_element_exists(driver, By.ID, SEARCH_INPUT_ID, "Search Input"):
+        search_elements_found = False
+    if not check_element_exists(driver, By.ID, "_ctl0_ContentPlaceHolder1_btnSearch", "Search Button"):
+        search_elements_found = False
+
+    if not search_elements_found:
+        log.warning("Critical search elements not found. Saving page state for debugging...")
+        capture_failure(artifacts, driver, "missing_search_elements", reason="search elements missing")
+
+        log.debug("Looking for alternative search elements...")
+
+        all_inputs = driver.find_elements(By.TAG_NAME, "input")
+        log.debug(f"Found {len(all_inputs)} input elements:")
+        for i, inp in enumerate(all_inputs[:10]):
+            try:
+                inp_id = inp.get_attribute("id")
+                inp_name = inp.get_attribute("name")
+                inp_type = inp.get_attribute("type")
+                inp_placeholder = inp.get_attribute("placeholder")
+                if inp_id or inp_name:
+                    log.debug(f"  [{i}] ID: {inp_id}, Name: {inp_name}, Type: {inp_type}, Placeholder: {inp_placeholder}")
+            except:
+                pass
+
+        all_buttons = driver.find_elements(By.TAG_NAME, "button")
+        all_inputs_button = driver.find_elements(By.XPATH, "//input[@type='button' or @type='submit']")
+        all_buttons.extend(all_inputs_button)
+        log.debug(f"Found {len(all_buttons)} button elements:")
+        for i, btn in enumerate(all_buttons[:10]):
+            try:
+                btn_id = btn.get_attribute("id")
+                btn_name = btn.get_attribute("name")
+                btn_value = btn.get_attribute("value")
+                btn_text = btn.text
+                if btn_id or btn_name or btn_value or btn_text:
+                    log.debug(f"  [{i}] ID: {btn_id}, Name: {btn_name}, Value: {btn_value}, Text: {btn_text}")
+            except:
+                pass
+
+    return search_elements_found
+
+
+class BrowserSession:
+    """A logged-in Chrome window parked inside SystemFrame, ready to search."""
+
+    def __init__(self, label="main", cache=None, selectors=None, profile="full", cookies=None, navigation="frame",
+                 vehicles=True, page_load_timeout=PAGE_LOAD_TIMEOUT, artifacts=None, driver_path=None):
+        self.label = label
+        self.driver_path = driver_path
+        self.artifacts = artifacts
+        self.vehicles = vehicles
+        self.profile = profile
+        self.page_load_timeout = page_load_timeout
+        self.navigation = navigation
+        # Set by return_to_search once the menu has no usable search link.
+        self.search_link_missing = False
+        self.driver = None
+        self.wait = None
+        self.cache = cache
+        self.cookies = cookies
+        self.selectors = selectors or SelectorRegistry()
+        self.timer = StepTimer()
+
+    def start(self):
+        self.timer.restart()
+        self.driver = create_driver(self.profile, self.page_load_timeout, self.driver_path)
+        self.timer.lap("browser")
+        self.wait = WebDriverWait(self.driver, 10)
         try:
-            inp_id = inp.get_attribute("id")
-            inp_name = inp.get_attribute("name")
-            inp_type = inp.get_attribute("type")
-            inp_placeholder = inp.get_attribute("placeholder")
-            if inp_id or inp_name:
-                print(f"  [{i}] ID: {inp_id}, Name: {inp_name}, Type: {inp_type}, Placeholder: {inp_placeholder}")
-        except:
-            pass
-    
-    all_buttons = driver.find_elements(By.TAG_NAME, "button")
-    all_inputs_button = driver.find_elements(By.XPATH, "//input[@type='button' or @type='submit']")
-    all_buttons.extend(all_inputs_button)
-    print(f"Found {len(all_buttons)} button elements:")
-    for i, btn in enumerate(all_buttons[:10]): 
+            if not self.restore_login():
+                login(self.driver, self.wait, self.artifacts)
+            if self.profile == "lean":
+                # login() may have moved to the cams.aspx window it opened.
+                block_assets(self.driver)
+            self.timer.lap("login")
+            enter_system_frame(self.driver, self.wait, self.artifacts)
+            self.timer.lap("frame")
+            if not check_search_elements(self.driver, self.artifacts):
+                log.error("Cannot proceed without search elements. Please check the page structure.")
+                raise SessionError("Search elements not found in SystemFrame")
+            if self.cookies is not None:
+                self.cookies.save(self.label, CAMS_URL, USERNAME, self.driver.get_cookies())
+        except Exception:
+            self.quit()
+            raise
+        emit_session_start(self)
+        return self
+
+    def restore_login(self):
+        """Reuse this label's saved cookies instead of logging in; False when there are none or they expired."""
+        if self.cookies is None:
+            return False
+        saved = self.cookies.load(self.label, CAMS_URL, USERNAME)
+        if not saved:
+            return False
+        if restore_session(self.driver, saved):
+            log.info(f"[{self.label}] Reused saved session, skipping login")
+            return True
+        log.info(f"[{self.label}] Saved session has expired, logging in again")
+        self.cookies.forget(self.label)
+        return False
+
+    def process_account(self, acct, manual):
+        return process_account(self, acct, manual)
+
+    def find(self, cascade, candidates, timeout, **kwargs):
+        """SelectorRegistry.find in this browser, noting the selector that matched for the account trace."""
+        element, selector = self.selectors.find(self.driver, cascade, candidates, timeout, **kwargs)
+        if selector is not None:
+            self.timer.note(cascade, selector)
+        return element, selector
+
+    def is_alive(self):
+        """A dead chromedriver raises on any command, even a cheap one."""
+        if self.driver is None:
+            return False
         try:
-            btn_id = btn.get_attribute("id")
-            btn_name = btn.get_attribute("name")
-            btn_value = btn.get_attribute("value")
-            btn_text = btn.text
-            if btn_id or btn_name or btn_value or btn_text:
-                print(f"  [{i}] ID: {btn_id}, Name: {btn_name}, Value: {btn_value}, Text: {btn_text}")
-        except:
-            pass
+            self.driver.window_handles
+            return True
+        except Exception:
+            return False
+
+    def rss_mb(self):
+        """Resident memory of this session's chromedriver and Chrome, or None when it can't be measured."""
+        return browser_rss_mb(self.driver) if self.driver is not None else None
+
+    def kill(self):
+        """Hard-stop a hung browser from another thread; the blocked WebDriver call then fails."""
+        if self.driver is not None:
+            kill_browser(self.driver)
+
+    def quit(self):
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+            self.driver = None
+
+
+# Reads a whole field map in one WebDriver round-trip. Mirrors what the old
+# per-field lookup did: an input's value, otherwise the element's text.
+EXTRACT_FIELDS_SCRIPT = """
+var ids = arguments[0], values = {}, missing = [];
+for (var i = 0; i < ids.length; i++) {
+    var el = document.getElementById(ids[i]);
+    if (el === null) {
+        missing.push(ids[i]);
+        continue;
+    }
+    var value = el.value || el.innerText || el.textContent || "";
+    values[ids[i]] = value.trim();
+}
+return [values, missing];
+"""
+
+
+def extract_fields(driver, field_map):
+    """Read every element of `field_map` (element ID -> output column) in one script call.
+
+    Returns ({column: value}, [IDs not on the page]); missing fields come
+    back as empty strings.
+    """
+    if not field_map:
+        return {}, []
+    values, missing = driver.execute_script(EXTRACT_FIELDS_SCRIPT, list(field_map))
+    return {column: values.get(ident) or "" for ident, column in field_map.items()}, missing
+
+
+def build_record(acct, manual, scraped):
+    """Assemble the output record from the input row and the scraped account fields.
+
+    `manual` is the input row as AccountSource yields it, dates already
+    formatted. `scraped` maps output columns (the values of ACCOUNT_FIELDS) to raw page
+    text, so every backend produces the same record shape.
+    """
+    return {
+        "AGENT": manual.get("AGENT", ""),
+        "ENDO DATE": manual.get("ENDO DATE", ""),
+        "PLACEMENT": manual.get("PLACEMENT", ""),
+        "ACCOUNT NO": acct,
+        "ACCOUNT NAME": scraped.get("ACCOUNT NAME", ""),
+        "PRIMARY ADDRESS": scraped.get("PRIMARY ADDRESS", ""),
+        "SECONDARY ADDRESS": scraped.get("SECONDARY ADDRESS", ""),
+        "OB": scraped.get("OB", ""),
+        "REM STAT": scraped.get("REM STAT", ""),
+        "DPD": scraped.get("DPD", ""),
+        "MOBILE #": scraped.get("MOBILE #", ""),
+        "NEW_PULLOUT_DATE": manual.get("NEW_PULLOUT_DATE", ""),
+        "Status": STATUS_SUCCESS
+    }
+
+
+def failed_record(acct, status, reason):
+    """Record for an account that produced no data; `reason` is a short, countable cause."""
+    return {"ACCOUNT NO": acct, "Status": status, "Reason": reason}
+
+
+# The collateral link sits in the hidden Account Details menu, so its URL
+# can be read straight off the account page without opening the dropdown.
+COLLATERAL_URL_SCRIPT = """
+var links = document.getElementsByTagName("a");
+for (var i = 0; i < links.length; i++) {
+    if (links[i].href.toLowerCase().indexOf("accountcollateral.aspx") !== -1) {
+        return links[i].href;
+    }
+}
+return null;
+"""
 
-if not search_elements_found:
-    print("Cannot proceed without search elements. Please check the page structure.")
-    driver.quit()
-    exit(1)
+# IDs of every unit's DetailLink on the collateral grid (dg__ctl2_, dg__ctl3_, ...).
+DETAIL_LINK_IDS_SCRIPT = """
+var ids = [], links = document.querySelectorAll("a[id^='dg__ctl'][id$='_DetailLink']");
+for (var i = 0; i < links.length; i++) {
+    ids.push(links[i].id);
+}
+return ids;
+"""
 
-for i, acct in enumerate(account_numbers, 1):
-    print(f"[{i}/{len(account_numbers)}] Searching for account: {acct}")
-    
+
+def detail_link_order(ident):
+    """Grid row number of a dg__ctlN_DetailLink ID, so units come out in grid order."""
+    digits = "".join(ch for ch in ident.split("_DetailLink")[0] if ch.isdigit())
+    return int(digits) if digits else 0
+
+
+def merge_units(units):
+    """Fold several collateral units into one record, joining each column with UNIT_SEPARATOR.
+
+    Empty values are kept so the Nth entry of every column belongs to the
+    same unit.
+    """
+    if len(units) == 1:
+        return units[0]
+    return {
+        column: UNIT_SEPARATOR.join(unit.get(column, "") for unit in units) if any(unit.get(column) for unit in units) else ""
+        for column in VEHICLE_FIELDS.values()
+    }
+
+
+def open_in_frame(driver, url, timeout=10):
+    """Load `url` into the current frame only, leaving the frameset around it in place."""
+    old_page = driver.find_element(By.TAG_NAME, "html")
+    driver.execute_script("window.location.href = arguments[0];", url)
+    return wait_for_navigation(driver, old_page, timeout)
+
+
+def walk_to_collateral(session, acct):
+    """Reach the collateral grid by clicking Account Details -> Collateral, for pages that hide its URL."""
+    driver = session.driver
+
+    account_details_dropdown, selector = session.find("account_details", ACCOUNT_DETAILS_SELECTORS, 10)
+    if not account_details_dropdown:
+        log.warning(f"Account Details dropdown not found for {acct}")
+        return False
+    log.debug(f"Found Account Details dropdown with: {selector}")
+    account_details_dropdown.click()
+    log.debug(f"Opened Account Details dropdown for {acct}")
+    session.timer.lap("account_details")
+
+    collateral_tab, selector = session.find("collateral", COLLATERAL_SELECTORS, 10)
+    if not collateral_tab:
+        log.warning(f"Collateral link not found in dropdown for {acct}")
+        return False
+    log.debug(f"Found collateral link with: {selector}")
+    collateral_tab.click()
+    log.debug(f"Accessing collateral information for {acct}")
+    wait_for_navigation(driver, collateral_tab)
+    return True
+
+
+def read_vehicle_unit(session, acct, link):
+    """Open one unit's detail view from the collateral grid and read its fields."""
+    driver = session.driver
+    link.click()
+    wait_for_navigation(driver, link)
     try:
-        manual = account_dict.get(acct, {})
-        
-        print(f"Navigating to main search page for account {acct}")
-        driver.get(CAMS_URL)
-        time.sleep(1)  
-        
-        try:
+        session.wait.until(EC.presence_of_element_located((By.ID, "txtPlateNum_AUTO")))
+    except TimeoutException:
+        pass
+    session.timer.lap("vehicle_nav")
+
+    vehicle_data, missing = extract_fields(driver, VEHICLE_FIELDS)
+    if missing:
+        log.warning(f"Could not find vehicle fields for {acct}: {', '.join(missing)}")
+    session.timer.lap("vehicle_extract")
+    return vehicle_data
+
+
+def add_vehicle_details(session, acct, data):
+    """Open the collateral grid and merge every unit's vehicle fields into `data`.
+
+    The grid's URL is read off the account page and loaded into the frame
+    directly; the Account Details -> Collateral clicks are only the
+    fallback. Each unit's detail view is a postback from the grid, so the
+    grid is reloaded between units.
+    """
+    driver = session.driver
+    timer = session.timer
+
+    try:
+        collateral_url = driver.execute_script(COLLATERAL_URL_SCRIPT)
+        if collateral_url and not collateral_url.lower().startswith("javascript:"):
+            log.debug(f"Accessing collateral information for {acct}")
+            open_in_frame(driver, collateral_url)
+        elif walk_to_collateral(session, acct):
+            collateral_url = None
+        else:
+            return
+        timer.lap("collateral")
+
+        link_ids = sorted(driver.execute_script(DETAIL_LINK_IDS_SCRIPT) or [], key=detail_link_order)
+        if not link_ids:
+            link, selector = session.find("vehicle_detail", VEHICLE_DETAIL_SELECTORS, 10)
+            if not link:
+                log.warning(f"Vehicle detail link not found for {acct}")
+                return
+            log.debug(f"Found vehicle detail link: {selector}")
+            units = [read_vehicle_unit(session, acct, link)]
+        else:
+            units = []
+            for n, ident in enumerate(link_ids):
+                if n:
+                    if collateral_url is None:
+                        log.warning(f"Collateral grid has no URL to return to; keeping the first unit of {acct}")
+                        break
+                    open_in_frame(driver, collateral_url)
+                    timer.lap("collateral")
+                units.append(read_vehicle_unit(session, acct, driver.find_element(By.ID, ident)))
+
+        data.update(merge_units(units))
+        if any(value for unit in units for value in unit.values()):
+            log.debug(f"Vehicle details extracted for {acct}" + (f" ({len(units)} units)" if len(units) > 1 else ""))
+        else:
+            log.info(f"No vehicle details found for {acct}")
+
+    except Exception as e:
+        log.warning(f"Could not access vehicle details for {acct}: {e}")
+
+
+def return_to_search(session):
+    """Bring SystemFrame back to the search form without reloading the frameset.
+
+    Reuses the search form when SystemFrame still shows it (e.g. after a
+    not-found search), otherwise clicks the app's search link in the menu
+    frame. Returns the search input, or None when neither worked and the
+    caller should fall back to a full reload. Once the menu link has
+    failed to turn up or to lead to the search form, the session stops
+    looking for it and every later account goes straight to the reload.
+    """
+    driver = session.driver
+    try:
+        found = driver.find_elements(By.ID, SEARCH_INPUT_ID)
+        if found:
+            return found[0]
+        if session.search_link_missing:
+            return None
+
+        driver.switch_to.default_content()
+        for frame in driver.find_elements(By.TAG_NAME, "frame"):
+            if frame.get_attribute("name") == "SystemFrame":
+                continue
+            driver.switch_to.frame(frame)
+            link, _ = session.find("search_link", SEARCH_LINK_SELECTORS, .5, optional=True)
+            if link:
+                link.click()
+                break
             driver.switch_to.default_content()
-            driver.switch_to.frame("SystemFrame")
-            print(f"Switched to SystemFrame for account {acct}")
-        except Exception as frame_error:
-            print(f"Frame switching error for {acct}: {frame_error}")
-            continue
-        
+        else:
+            log.info(f"[{session.label}] No search link in the menu; reloading cams.aspx for every account")
+            session.search_link_missing = True
+            return None
+
+        driver.switch_to.default_content()
+        driver.switch_to.frame("SystemFrame")
         try:
-            search_input = wait.until(EC.presence_of_element_located((By.ID, "_ctl0_ContentPlaceHolder1_txtSearch")))
-            print(f"Search input found for account {acct}")
-        except:
-            print(f"Search input not found for account {acct}. Skipping...")
-            driver.save_screenshot(f"search_input_missing_{acct.replace('/', '_')}.png")
-            continue
-        
+            search_input = WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, SEARCH_INPUT_ID)))
+        except TimeoutException:
+            log.info(f"[{session.label}] The menu's search link did not open the search form; "
+                     f"reloading cams.aspx for every account")
+            session.search_link_missing = True
+            return None
+        wait_for_page_ready(driver)
+        return search_input
+    except Exception as e:
+        log.warning(f"Could not get back to the search form in place: {e}")
+        return None
+
+
+def process_account(session, acct, manual):
+    """Search one account and scrape it.
+
+    Always returns a record: the scraped one, or a failed_record saying
+    why the account was not found or could not be read.
+    """
+    driver = session.driver
+    wait = session.wait
+    timer = session.timer
+    timer.restart()
+
+    try:
+        search_input = None
+        if session.navigation == "frame":
+            search_input = return_to_search(session)
+        if search_input is None:
+            log.debug(f"Navigating to main search page for account {acct}")
+            driver.get(CAMS_URL)
+
+            try:
+                driver.switch_to.default_content()
+                wait.until(EC.frame_to_be_available_and_switch_to_it("SystemFrame"))
+                log.debug(f"Switched to SystemFrame for account {acct}")
+            except Exception as frame_error:
+                log.warning(f"Frame switching error for {acct}: {frame_error}")
+                return failed_record(acct, STATUS_ERROR, "frame switch failed")
+
+            try:
+                search_input = wait.until(EC.presence_of_element_located((By.ID, SEARCH_INPUT_ID)))
+                log.debug(f"Search input found for account {acct}")
+            except:
+                log.warning(f"Search input not found for account {acct}. Skipping...")
+                capture_failure(session.artifacts, driver, "search_input_missing", acct, "search input missing")
+                return failed_record(acct, STATUS_ERROR, "search input missing")
+        timer.lap("navigate")
+
         search_input.clear()
         search_input.send_keys(acct)
-        print(f"Entered account number: {acct}")
-        
+        log.debug(f"Entered account number: {acct}")
+
         try:
             search_button = driver.find_element(By.ID, "_ctl0_ContentPlaceHolder1_btnSearch")
             search_button.click()
-            print(f"Search button clicked for {acct}")
+            log.debug(f"Search button clicked for {acct}")
         except:
-            print(f"Search button not found for account {acct}. Skipping...")
-            driver.save_screenshot(f"search_button_missing_{acct.replace('/', '_')}.png")
-            continue
-        
-        time.sleep(.25)
-        
-        results_area_selectors = [
-            f"//td[contains(text(), '{acct}')]",
-            f"//tr[contains(., '{acct}')]",
-            f"//*[contains(text(), '{acct}')]"
-        ]
-        
-        account_link = None
-        for selector in results_area_selectors:
-            try:
-                short_wait = WebDriverWait(driver, .25)
-                account_link = short_wait.until(EC.element_to_be_clickable((By.XPATH, selector)))
-                print(f"Found account result with selector: {selector}")
-                break
-            except:
-                continue
-        
+            log.warning(f"Search button not found for account {acct}. Skipping...")
+            capture_failure(session.artifacts, driver, "search_button_missing", acct, "search button missing")
+            return failed_record(acct, STATUS_ERROR, "search button missing")
+
+        wait_for_navigation(driver, search_input)
+        timer.lap("search")
+
+        account_link, selector = session.find("result", RESULT_SELECTORS, .75, acct=acct)
+        if account_link:
+            log.debug(f"Found account result with selector: {selector}")
+
         if account_link:
             account_link.click()
-            print(f"Found and selected account: {acct}")
-            time.sleep(.25)
-            
+            log.debug(f"Found and selected account: {acct}")
             try:
-                popup_ok_selectors = [
-                    (By.XPATH, "//button[text()='OK']"),
-                    (By.XPATH, "//button[contains(text(), 'OK')]"),
-                    (By.XPATH, "//input[@value='OK']"),
-                    (By.ID, "OK"),
-                    (By.CLASS_NAME, "ui-button"),
-                    (By.XPATH, "//div[contains(@class, 'ui-dialog')]//button"),
-                    (By.XPATH, "//button[contains(@class, 'ylin') and contains(text(), 'OK')]")
-                ]
-                
-                popup_dismissed = False
-                for by, selector in popup_ok_selectors:
-                    try:
-                        popup_wait = WebDriverWait(driver, .75)
-                        ok_button = popup_wait.until(EC.element_to_be_clickable((By.XPATH, selector)))
-                        ok_button.click()
-                        print(f"Dismissed popup for account {acct}")
-                        popup_dismissed = True
-                        time.sleep(.75)  
-                        break
-                    except:
-                        continue
-                
-                if not popup_dismissed:
-                    print(f"No popup found for account {acct} (this is normal)")
-                    
+                wait.until(lambda d: EC.staleness_of(account_link)(d)
+                           or d.find_elements(By.XPATH, "//div[contains(@class, 'ui-dialog')]"))
+                wait_for_page_ready(driver)
+            except TimeoutException:
+                pass
+            timer.lap("result")
+
+            try:
+                ok_button, selector = session.find("popup", POPUP_OK_SELECTORS, .75, optional=True)
+                if ok_button:
+                    ok_button.click()
+                    log.debug(f"Dismissed popup for account {acct}")
+                    WebDriverWait(driver, 5).until(EC.invisibility_of_element(ok_button))
+                else:
+                    log.debug(f"No popup found for account {acct} (this is normal)")
+
             except Exception as popup_error:
-                print(f"Error handling popup for {acct}: {popup_error}")
-            
+                log.warning(f"Error handling popup for {acct}: {popup_error}")
+            timer.lap("popup")
+
+        else:
+            log.info(f"Account {acct} not found in search results")
+            timer.lap("result")
+            return failed_record(acct, STATUS_NOT_FOUND, "not in search results")
+
+        log.debug(f"Extracting account details for {acct}...")
+
+        cached = session.cache.lookup(acct) if session.cache else {}
+        known = {column: value for group in cached.values() for column, value in group.items()}
+
+        scraped, missing = extract_fields(driver, {ident: column for ident, column in ACCOUNT_FIELDS.items() if column not in known})
+        if missing:
+            log.warning(f"Could not find account fields for {acct}: {', '.join(missing)}")
+        fields = {**known, **scraped}
+        data = build_record(acct, manual, fields)
+
+        timer.lap("extract")
+
+        # Judged on the cached fields too: OB, REM STAT and DPD alone are often all blank.
+        if not any(fields.values()):
+            log.warning(f"No basic account information found for {acct}")
+            capture_failure(session.artifacts, driver, "no_account_info", acct, "no account information")
+            return failed_record(acct, STATUS_ERROR, "no account information")
+
+        if not session.vehicles:
+            pass
+        elif "collateral" in cached:
+            data.update(cached["collateral"])
+            log.debug(f"Using cached vehicle details for {acct}")
+        else:
+            add_vehicle_details(session, acct, data)
+
+        if session.cache:
+            session.cache.store(acct, data, skip=cached)
+
+        log.debug(f"Successfully processed account: {acct}")
+        return data
+
+    except Exception as e:
+        log.warning(f"Error processing account {acct}: {str(e)}")
+        return failed_record(acct, STATUS_ERROR, type(e).__name__)
+
+
+def drain(session, work, pacer, on_result=None, recycler=None):
+    """Process accounts from `work` with one session until the queue is finished.
+
+    Errors go back into `work` with a backoff; an account that has used
+    up its retries, or ended in success or not-found, is passed to
+    `on_result`. With a `recycler`, each account runs under its hang
+    watchdog and the browser is replaced whenever it is due. Returns
+    False when the session died, after handing its in-flight account back
+    for another session to pick up.
+    """
+    label = session.label
+    handled = 0
+    while True:
+        item = work.get()
+        if item is None:
+            return True
+        index, acct, manual = item
+        retries = work.retries_used(acct)
+        log.debug(f"[{label}] [{work.progress(index)}] Searching for account: {acct}"
+                  + (f" (retry {retries})" if retries else ""))
+
+        pacer.wait()
+        started = time.perf_counter()
+        if recycler is not None:
+            with recycler.watch(session):
+                data = session.process_account(acct, manual)
         else:
-            print(f"Account {acct} not found in search results - skipping...")
+            data = session.process_account(acct, manual)
+        seconds = time.perf_counter() - started
+        failed = data["Status"] == STATUS_ERROR
+        pacer.record(seconds, healthy=not failed)
+
+        alive = not failed or session.is_alive()
+        delay = None
+        if failed:
+            # A dead session's account goes straight to the next session.
+            delay = work.retry(item, delay=None if alive else 0)
+        trace = {
+            "session": label, "account": acct, "index": index, "attempt": retries + 1,
+            "status": data["Status"], "reason": data.get("Reason"), "seconds": round(seconds, 4),
+            "steps": session.timer.trace, "selectors": session.timer.notes, "final": delay is None,
+        }
+        if delay is not None:
+            emit("account", f"[{label}] {acct} failed ({data['Reason']}), retrying in {delay:.1f}s",
+                 logging.WARNING, **trace)
+            if not alive:
+                return False
             continue
+        if failed:
+            emit("account", f"[{label}] Giving up on {acct} after {work.max_retries} retries: {data['Reason']}",
+                 logging.ERROR, **trace)
+        else:
+            emit("account", f"[{label}] [{work.progress(index)}] {acct}: {data['Status']} in {seconds:.2f}s", **trace)
+
+        if on_result is not None:
+            on_result(index, acct, data)
+        work.done()
+        if not alive:
+            return False
 
-        def safe_text(by, ident):
+        handled += 1
+        reason = recycler.due(session, handled) if recycler is not None else None
+        if reason:
             try:
-                el = driver.find_element(by, ident)
-                value = el.get_attribute("value") or el.text
-                return value.strip() if value else ""
+                recycler.recycle(session, reason)
             except Exception as e:
-                print(f"Could not find element {ident}: {str(e)}")
-                return ""
-
-        print(f"Extracting account details for {acct}...")
-        
-        rem_stat_full = safe_text(By.ID, "txtREM_STAT")
-        rem_stat_number = rem_stat_full.split('/')[0].strip() if rem_stat_full else ""
-        
-        endo_date = manual.get("ENDO DATE", "")
-        if endo_date:
-            try:
-                endo_date = pd.to_datetime(endo_date).strftime("%m/%d/%Y")
-            except:
-                print(f"Invalid ENDO DATE format for {acct}: {endo_date}")
-        
-        new_pullout_date = manual.get("NEW_PULLOUT_DATE", "")
-        if new_pullout_date:
-            try:
-                new_pullout_date = pd.to_datetime(new_pullout_date).strftime("%m/%d/%Y")
-            except:
-                print(f"Invalid NEW_PULLOUT_DATE format for {acct}: {new_pullout_date}")
-        
-        data = {
-            "AGENT": manual.get("AGENT", ""),
-            "ENDO DATE": endo_date,
-            "PLACEMENT": manual.get("PLACEMENT", ""),
-            "ACCOUNT NO": acct,
-            "ACCOUNT NAME": safe_text(By.ID, "lblSHORTNAME"),
-            "PRIMARY ADDRESS": safe_text(By.ID, "lblADDRESS"),
-            "SECONDARY ADDRESS": safe_text(By.ID, "lblADDRESS2"),
-            "OB": safe_text(By.ID, "lblOUT_BAL"),
-            "REM STAT": rem_stat_number,
-            "DPD": safe_text(By.ID, "lblAGESRC"),
-            "MOBILE #": safe_text(By.ID, "txtMobile"),
-            "NEW_PULLOUT_DATE": new_pullout_date,
-            "Status": "Success"
-        }
-        
-        if not any(data[key] for key in data if key not in ["ACCOUNT NO", "Status", "AGENT", "ENDO DATE", "PLACEMENT", "NEW_PULLOUT_DATE"]):
-            print(f"No basic account information found for {acct}. Skipping...")
-            driver.save_screenshot(f"no_account_info_{acct.replace('/', '_')}.png")
-            continue
+                log.error(f"[{label}] Could not start the recycled browser: {e}")
+                return False
+            handled = 0
+
 
+def keep_draining(session, work, pacer, on_result=None, recycler=None):
+    """`drain` with a started `session`, starting it again each time it dies.
+
+    Returns once the queue is finished or the session cannot be brought
+    back; the caller quits it.
+    """
+    while not drain(session, work, pacer, on_result, recycler):
+        log.warning(f"[{session.label}] Session died, starting a new one...")
+        session.quit()
         try:
-            account_details_selectors = [
-                (By.PARTIAL_LINK_TEXT, "Account Details"),
-                (By.LINK_TEXT, "Account Details"),
-                (By.XPATH, "//a[contains(text(), 'Account Details')]"),
-                (By.CLASS_NAME, "dropdown-toggle"),
-                (By.XPATH, "//a[@class='dropdown-toggle' and contains(text(), 'Account Details')]")
-            ]
-            
-            account_details_dropdown = None
-            for by, selector in account_details_selectors:
-                try:
-                    account_details_dropdown = wait.until(EC.element_to_be_clickable((By.XPATH, selector)))
-                    print(f"Found Account Details dropdown with: {selector}")
-                    break
-                except:
-                    continue
-            
-            if account_details_dropdown:
-                account_details_dropdown.click()
-                print(f"Opened Account Details dropdown for {acct}")
-                time.sleep(.75)
-                
-                collateral_selectors = [
-                    (By.PARTIAL_LINK_TEXT, "Collateral"),
-                    (By.LINK_TEXT, "Collateral"),
-                    (By.XPATH, "//a[contains(text(), 'Collateral')]"),
-                    (By.XPATH, "//a[contains(@href, 'accountcollateral.aspx')]"),
-                    (By.XPATH, "//*[contains(text(), 'Collateral')]")
-                ]
-                
-                collateral_tab = None
-                for by, selector in collateral_selectors:
-                    try:
-                        collateral_tab = wait.until(EC.element_to_be_clickable((By.XPATH, selector)))
-                        print(f"Found collateral link with: {selector}")
-                        break
-                    except:
-                        continue
-                
-                if collateral_tab:
-                    collateral_tab.click()
-                    print(f"Accessing collateral information for {acct}")
-                    time.sleep(1)
-                    
-                    try:
-                        vehicle_detail_selectors = [
-                            "dg__ctl2_DetailLink",
-                            "DetailLink",
-                            "//a[contains(@id, 'DetailLink')]",
-                            "//a[contains(text(), 'Detail')]",
-                            "//a[contains(@id, 'dg_') and contains(@id, 'DetailLink')]"
-                        ]
-                        
-                        vehicle_detail_link = None
-                        for selector in vehicle_detail_selectors:
-                            try:
-                                if selector.startswith("//"):
-                                    vehicle_detail_link = wait.until(EC.element_to_be_clickable((By.XPATH, selector)))
-                                else:
-                                    vehicle_detail_link = wait.until(EC.element_to_be_clickable((By.ID, selector)))
-                                print(f"Found vehicle detail link: {selector}")
-                                break
-                            except:
-                                continue
-                        
-                        if vehicle_detail_link:
-                            vehicle_detail_link.click()
-                            time.sleep(1)
-                            
-                            vehicle_data = {
-                                "COLOR": safe_text(By.ID, "txtColor_AUTO"),
-                                "PLATE #": safe_text(By.ID, "txtPlateNum_AUTO"),
-                                "SERIAL #": safe_text(By.ID, "txtSerialNo_AUTO"),
-                                "ENGINE #": safe_text(By.ID, "txtEngineNo_AUTO"),
-                                "UNIT DESCRIPTION": safe_text(By.ID, "txtUnitDesc_AUTO"),
-                            }
-                            data.update(vehicle_data)
-                            
-                            if any(vehicle_data.values()):
-                                print(f"Vehicle details extracted for {acct}")
-                            else:
-                                print(f"No vehicle details found for {acct}")
-                        else:
-                            print(f"Vehicle detail link not found for {acct}")
-                            
-                    except Exception as e:
-                        print(f"Could not access vehicle details for {acct}: {e}")
-                        
-                else:
-                    print(f"Collateral link not found in dropdown for {acct}")
-            else:
-                print(f"Account Details dropdown not found for {acct}")
-                
+            session.start()
+        except Exception as e:
+            log.error(f"[{session.label}] Could not restart the session: {e}")
+            return
+
+
+def abandon_remaining(work, on_result=None, abandon=True):
+    """Report accounts left in `work` after every session stopped as errors.
+
+    With `abandon` False they are neither read nor reported: a shared lease
+    queue hands them to another worker instead.
+    """
+    if not abandon:
+        if not work.finished():
+            log.error("All sessions stopped; leaving the remaining accounts to other workers")
+        return
+    left = work.abandon()
+    if left:
+        log.error(f"All sessions stopped with {len(left)} accounts still unprocessed")
+    if on_result is not None:
+        for index, acct, _ in left:
+            on_result(index, acct, failed_record(acct, STATUS_ERROR, "no live session"))
+
+
+def run_sequential(accounts, session_factory=None, on_result=None, max_retries=MAX_RETRIES, pacer=None,
+                   recycler=None, abandon=True):
+    """Process the accounts in one session, calling `on_result(index, acct, record)` once per account.
+
+    `accounts` yields ``(index, acct, manual)`` and is read lazily.
+    A session that dies is restarted, and with a `recycler` its browser
+    is also renewed on schedule. Accounts left once it cannot be
+    brought back go through `abandon_remaining`. Raises SessionError when
+    the first session cannot start. Returns the StepTimer of every
+    session used.
+    """
+    session_factory = session_factory or BrowserSession
+    work = WorkQueue(accounts, max_retries)
+    pacer = pacer or Pacer()
+    timer = StepTimer()
+
+    session = session_factory()
+    session.start()
+
+    log.info("Starting account processing...")
+    try:
+        keep_draining(session, work, pacer, on_result, recycler)
+    finally:
+        #input("Press ENTER to close the browser...")
+        session.quit()
+        timer.merge(session.timer)
+
+    abandon_remaining(work, on_result, abandon)
+    timer.report()
+    pacer.report()
+    if recycler is not None:
+        recycler.report()
+    return timer
+
+
+def run_worker_pool(accounts, workers, session_factory=None, on_result=None, max_retries=MAX_RETRIES, pacer=None,
+                    recycler=None, abandon=True):
+    """Spread the ``(index, acct, manual)`` items of `accounts` over `workers` sessions.
+
+    All sessions pull from one shared WorkQueue, so retries and the
+    account of a browser that died drain through the other sessions
+    while its worker starts a new one. Accounts left once every session
+    has stopped go through `abandon_remaining`.
+    `on_result` is called from the worker threads in completion order;
+    wrap it in InputOrder to get input order back. Returns the StepTimer
+    merged across sessions.
+    """
+    work = WorkQueue(accounts, max_retries)
+    pacer = pacer or Pacer()
+    timer = StepTimer()
+    lock = threading.Lock()
+    session_factory = session_factory or BrowserSession
+
+    def worker(label):
+        session = session_factory(label)
+        try:
+            session.start()
         except Exception as e:
-            print(f"Could not access Account Details dropdown for {acct}: {e}")
+            log.error(f"[{label}] Could not start browser session: {e}")
+            return
+
+        try:
+            keep_draining(session, work, pacer, on_result, recycler)
+        finally:
+            session.quit()
+            with lock:
+                timer.merge(session.timer)
+
+    threads = [
+        threading.Thread(target=worker, args=(f"worker-{n}",), name=f"worker-{n}")
+        for n in range(1, workers + 1)
+    ]
+    log.info(f"Starting account processing with {len(threads)} sessions...")
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    abandon_remaining(work, on_result, abandon)
+    timer.report()
+    pacer.report()
+    if recycler is not None:
+        recycler.report()
+    return timer
+
+
+class InputOrder:
+    """Hands finished records to `emit` in input order.
 
-        # Only append successful account data
-        data["Status"] = "Success"
-        results.append(data)
-        print(f"Successfully processed account: {acct}")
+    Records are put by their input index. Results arriving ahead of an
+    unfinished earlier account are held until the gap closes; failed
+    records are passed on too, so `emit` decides what to keep. Only the
+    out-of-order window is ever held in memory.
+    """
 
+    def __init__(self, emit):
+        self.emit = emit
+        self.pending = {}
+        self.cursor = 0
+        self.lock = threading.Lock()
+
+    def put(self, index, data):
+        with self.lock:
+            self.pending[index] = data
+            while self.cursor in self.pending:
+                data = self.pending.pop(self.cursor)
+                self.cursor += 1
+                if data is not None:
+                    self.emit(data)
+
+    def flush(self):
+        """Emit whatever is still held, e.g. when workers died before finishing every account."""
+        with self.lock:
+            for index in sorted(self.pending):
+                data = self.pending.pop(index)
+                if data is not None:
+                    self.emit(data)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape CAMS account details into the endorsement template.")
+    parser.add_argument("--input", default=input_excel,
+                        help=f"account list: .xlsx or .csv with an 'Account No' column, or .txt with one account per line (default: {input_excel})")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of parallel sessions to split the accounts across (default: 1)")
+    parser.add_argument("--backend", choices=["browser", "http"], default="browser",
+                        help="scrape through Chrome, or replay the WebForms postbacks over plain HTTP (default: browser)")
+    parser.add_argument("--output", action="append", choices=OUTPUT_FORMATS, default=None,
+                        help="where records go; repeat to write several at once: the xlsx template, csv, parquet "
+                             "(needs pyarrow) or an upserting sqlite database (default: xlsx)")
+    parser.add_argument("--sqlite", default=DEFAULT_SQLITE_PATH,
+                        help=f"database --output sqlite keeps the latest record per account in (default: {DEFAULT_SQLITE_PATH})")
+    parser.add_argument("--journal", default=None,
+                        help="checkpoint file finished records are appended to (default: <input>.journal.jsonl)")
+    parser.add_argument("--resume", action="store_true",
+                        help="skip accounts already recorded in the journal from an interrupted run")
+    parser.add_argument("--queue", default=None,
+                        help="shared SQLite queue file (e.g. on a network share): work as a leasing worker, "
+                             "or with --coordinate load it and write the workbook once it is drained")
+    parser.add_argument("--coordinate", action="store_true",
+                        help="with --queue: enqueue --input, wait for the workers, then write the outputs")
+    parser.add_argument("--lease-seconds", type=float, default=300,
+                        help="with --queue: how long a leased account may go without a heartbeat before it is reclaimed (default: 300)")
+    parser.add_argument("--poll", type=float, default=5.0,
+                        help="with --queue: seconds between queue checks while waiting (default: 5)")
+    parser.add_argument("--max-retries", type=int, default=MAX_RETRIES,
+                        help=f"times a failed account is retried, with exponential backoff (default: {MAX_RETRIES})")
+    parser.add_argument("--profile", choices=BROWSER_PROFILES, default="full",
+                        help="browser profile: the visible full browser, or headless without images/CSS (default: full)")
+    parser.add_argument("--navigation", choices=NAVIGATION_MODES, default="frame",
+                        help="return to the search form through the app's menu link, or reload cams.aspx for every account (default: frame)")
+    parser.add_argument("--page-load-timeout", type=float, default=PAGE_LOAD_TIMEOUT,
+                        help=f"seconds a browser page load may take before it is abandoned, 0 for no limit (default: {PAGE_LOAD_TIMEOUT})")
+    parser.add_argument("--recycle-every", type=int, default=DEFAULT_RECYCLE_EVERY,
+                        help=f"restart each browser after this many accounts, 0 to never (default: {DEFAULT_RECYCLE_EVERY})")
+    parser.add_argument("--recycle-rss-mb", type=float, default=DEFAULT_MAX_RSS_MB,
+                        help=f"restart a browser once chromedriver and Chrome use more memory than this, 0 to never; needs psutil (default: {DEFAULT_MAX_RSS_MB})")
+    parser.add_argument("--hang-timeout", type=float, default=DEFAULT_HANG_TIMEOUT,
+                        help=f"kill and replace a session stuck this many seconds on one account, 0 to never (default: {DEFAULT_HANG_TIMEOUT})")
+    parser.add_argument("--driver-cache", default=DEFAULT_DRIVER_CACHE,
+                        help=f"where the resolved chromedriver and Chrome version are remembered (default: {DEFAULT_DRIVER_CACHE})")
+    parser.add_argument("--update-driver", action="store_true",
+                        help="check online for a matching chromedriver even if the cached one fits the installed Chrome")
+    parser.add_argument("--log-level", choices=LOG_LEVELS, default="info",
+                        help="console detail: debug shows every step, info one line per account (default: info)")
+    parser.add_argument("--events", default=None,
+                        help="also write every log record and the per-account traces to this JSON-lines file")
+    parser.add_argument("--events-level", choices=LOG_LEVELS, default="info",
+                        help="detail written to --events (default: info)")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="serve live Prometheus metrics on http://127.0.0.1:PORT/metrics while the run is going")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="report the time spent in each start-up phase, up to the first finished account")
+    parser.add_argument("--selector-stats", default=DEFAULT_STATS_PATH,
+                        help=f"where locator win counts are kept between runs (default: {DEFAULT_STATS_PATH})")
+    parser.add_argument("--session-store", default=DEFAULT_COOKIE_PATH,
+                        help=f"owner-only file login cookies are saved to and reused from (default: {DEFAULT_COOKIE_PATH})")
+    parser.add_argument("--no-session-reuse", action="store_true",
+                        help="always log in with credentials and don't save the session")
+    parser.add_argument("--artifacts", default=DEFAULT_ARTIFACT_DIR,
+                        help=f"folder failure screenshots and page dumps go to, one subfolder per run (default: {DEFAULT_ARTIFACT_DIR})")
+    parser.add_argument("--artifact-max-count", type=int, default=DEFAULT_MAX_COUNT,
+                        help=f"distinct failure pages saved per run before capture stops (default: {DEFAULT_MAX_COUNT})")
+    parser.add_argument("--artifact-max-mb", type=float, default=DEFAULT_MAX_MB,
+                        help=f"megabytes of failure artifacts saved per run before capture stops (default: {DEFAULT_MAX_MB})")
+    parser.add_argument("--no-artifacts", action="store_true",
+                        help="don't save screenshots or page dumps of failures")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH,
+                        help=f"per-account field cache reused between runs (default: {DEFAULT_CACHE_PATH})")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="neither read nor write the field cache")
+    parser.add_argument("--refresh", action="store_true",
+                        help="ignore cached fields and scrape everything, then rewrite the cache")
+    parser.add_argument("--cache-max-accounts", type=int, default=DEFAULT_MAX_ACCOUNTS,
+                        help=f"accounts kept in the cache before the least recently used are evicted (default: {DEFAULT_MAX_ACCOUNTS})")
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.max_retries < 0:
+        parser.error("--max-retries cannot be negative")
+    if min(args.page_load_timeout, args.recycle_every, args.recycle_rss_mb, args.hang_timeout) < 0:
+        parser.error("--page-load-timeout, --recycle-every, --recycle-rss-mb and --hang-timeout cannot be negative")
+    if args.coordinate and not args.queue:
+        parser.error("--coordinate needs --queue")
+    return args
+
+
+def build_session_factory(args, startup=None):
+    """Session factory for the chosen backend, plus the selector registry, cache and artifact writer the caller closes.
+
+    Laps "chromedriver" on the `startup` timer, when given, once the driver is resolved.
+    """
+    selectors = None
+    session_factory = BrowserSession
+    if args.backend == "http":
+        from cams_http import HttpSession
+        session_factory = HttpSession
+    else:
+        driver_path = resolve_driver(args.driver_cache, update=args.update_driver)
+        if startup is not None:
+            startup.lap("chromedriver")
+        selectors = SelectorRegistry(args.selector_stats)
+        session_factory = functools.partial(session_factory, selectors=selectors, profile=args.profile,
+                                            navigation=args.navigation, page_load_timeout=args.page_load_timeout,
+                                            driver_path=driver_path)
+
+    if not args.no_session_reuse:
+        session_factory = functools.partial(session_factory, cookies=CookieStore(args.session_store))
+
+    cache = None
+    if not args.no_cache:
+        cache = ResultCache(args.cache, args.cache_max_accounts, refresh=args.refresh)
+        session_factory = functools.partial(session_factory, cache=cache)
+
+    artifacts = None
+    if not args.no_artifacts:
+        artifacts = ArtifactWriter(args.artifacts, args.artifact_max_count, args.artifact_max_mb)
+        session_factory = functools.partial(session_factory, artifacts=artifacts)
+    return session_factory, selectors, cache, artifacts
+
+
+def build_recycler(args):
+    # Plain HTTP sessions don't leak like Chrome, so they only get the watchdog.
+    browser = args.backend == "browser"
+    return Recycler(every=args.recycle_every if browser else None,
+                    max_rss_mb=args.recycle_rss_mb if browser else None,
+                    hang_timeout=args.hang_timeout)
+
+
+def close_shared(selectors, cache, artifacts=None):
+    if artifacts is not None:
+        artifacts.close()
+    if cache is not None:
+        cache.report()
+        cache.close()
+    if selectors is not None:
+        selectors.report()
+        selectors.save()
+
+
+def open_input(path):
+    log.info(f"📊 Reading account numbers from {path}...")
+    try:
+        return AccountSource(path)
     except Exception as e:
-        print(f"Error processing account {acct}: {str(e)}")
-        continue
-    
-    if i < len(account_numbers):  
-        print(f"Waiting before processing next account...")
-        time.sleep(.5)
-
-print("Saving results to Excel using template...")
-try:
-    wb = openpyxl.load_workbook(template_path)
-    ws = wb.active
-    
-    headers = {}
-    for cell in ws[1]:
-        if cell.value:
-            header_name = str(cell.value).strip().upper()
-            headers[header_name] = cell.column
-            print(f"Found header: '{header_name}' in column {cell.column}")
-    
-    print(f"Template headers found: {list(headers.keys())}")
-    
-    row_idx = 2 
-    for entry in results:
-        if entry.get("Status") != "Success":
-            continue
-            
-        print(f"Writing data for row {row_idx}: Account {entry.get('ACCOUNT NO', 'Unknown')}")
-        
-        for data_key, data_value in entry.items():
-            if data_key == "Status":
-                continue
-                
-            data_key_upper = str(data_key).strip().upper()
-            
-            if data_key_upper in headers:
-                col_num = headers[data_key_upper]
-                cell = ws.cell(row=row_idx, column=col_num)
-                cell.value = str(data_value) if data_value is not None else ""
-                if data_key_upper in ["ENDO DATE", "NEW_PULLOUT_DATE"]:
-                    cell.number_format = '@'
-                print(f"Set {data_key_upper}: '{data_value}' in column {col_num}")
-            else:
-                print(f"No matching header found for: '{data_key_upper}'")
-        
-        row_idx += 1
-
-    output_excel = f"psb_auto-new-{timestamp}.xlsx"
-
-    wb.save(output_excel)
-    print(f"Results saved to: {output_excel}")
-    print(f"Total accounts processed: {len(results)}")
-    
-    successful = sum(1 for r in results if r.get("Status") == "Success")
-    not_found = sum(1 for r in results if r.get("Status") == "Not Found")
-    errors = len(results) - successful - not_found
-    
+        log.error(f"Error loading input file: {e}")
+        raise e
+
+
+def open_writer():
+    log.info("Opening output workbook from template...")
+    return TemplateWriter(template_path, f"psb_auto-new-{timestamp}.xlsx",
+                          fallback_path=f"psb_auto-fallback-{timestamp}.xlsx", fallback_columns=RECORD_COLUMNS)
+
+
+def open_sinks(args):
+    """One sink per --output format, opened before any session starts."""
+    sinks = []
+    for output in dict.fromkeys(args.output or ["xlsx"]):
+        try:
+            if output == "xlsx":
+                sinks.append(open_writer())
+            elif output == "csv":
+                sinks.append(CsvWriter(f"psb_auto-new-{timestamp}.csv", RECORD_COLUMNS))
+            elif output == "parquet":
+                sinks.append(ParquetWriter(f"psb_auto-new-{timestamp}.parquet", RECORD_COLUMNS))
+            elif output == "sqlite":
+                sinks.append(SqliteSink(args.sqlite, RECORD_COLUMNS))
+        except Exception as e:
+            log.error(f"Error opening {output} output: {e}")
+            raise e
+    return sinks
+
+
+def close_sinks(sinks):
+    """Close every sink; True when all of them saved."""
+    return all([sink.close() is not None for sink in sinks])
+
+
+def wants_vehicles(sinks):
+    """Whether any sink has somewhere to put the collateral columns; only the template can lack them."""
+    for sink in sinks:
+        headers = getattr(sink, "headers", None)
+        if headers is None or any(column.upper() in headers for column in VEHICLE_FIELDS.values()):
+            return True
+    log.info("Template has no vehicle columns; skipping the collateral pages")
+    return False
+
+
+def report_startup(startup, timer, first_record):
+    """Print the --profile-startup table: main()'s phases, the first session's start, and time to first record."""
+    print("Start-up phases:")
+    for step, durations in startup.steps.items():
+        print(f"  {step:<24}{durations[0]:>8.2f} s")
+    for step in ("browser", "login", "frame"):
+        if step in timer.steps:
+            print(f"  {step + ' (first session)':<24}{timer.steps[step][0]:>8.2f} s")
+    if first_record:
+        print(f"  {'first record, in total':<24}{first_record[0] - STARTED:>8.2f} s")
+
+
+def print_summary(statuses, errors):
+    print(f"Total accounts processed: {sum(statuses.values())}")
     print(f"Summary:")
-    print(f"  - Successful: {successful}")
-    print(f"  - Not Found: {not_found}")
-    print(f"  - Errors: {errors}")
-    
-except Exception as e:
-    print(f"Error saving results: {e}")
+    print(f"  - Successful: {statuses[STATUS_SUCCESS]}")
+    print(f"  - Not found: {statuses[STATUS_NOT_FOUND]}")
+    print(f"  - Errors: {statuses[STATUS_ERROR]}")
+    for reason, n in errors.most_common():
+        print(f"      {n} x {reason}")
+
+
+def coordinate(args):
+    """Load the input into the shared queue, wait for the workers to drain it, then write the outputs."""
+    from cams_lease import LeaseQueue
+
+    source = open_input(args.input)
+    sinks = open_sinks(args)
+    leases = LeaseQueue(args.queue, args.lease_seconds)
+    leases.set_meta("vehicles", wants_vehicles(sinks))
+    added = leases.enqueue(source)
+    source.report()
+    log.info(f"Queued {added} new accounts in {args.queue}; start workers with: cams.py --queue {args.queue}")
+
+    last = None
+    while not leases.finished():
+        counts = leases.counts()
+        if counts != last:
+            log.info(f"Queue: {counts['pending']} pending, {counts['leased']} leased, "
+                  f"{counts['done']} done, {counts['failed']} failed")
+            last = counts
+        time.sleep(args.poll)
+
+    statuses = collections.Counter()
+    errors = collections.Counter()
+    for record in leases.records():
+        statuses[record["Status"]] += 1
+        if record["Status"] == STATUS_ERROR:
+            errors[record.get("Reason", "")] += 1
+        for sink in sinks:
+            sink.write(record)
+    leases.close()
+    close_sinks(sinks)
+    print_summary(statuses, errors)
+
+
+def work_queue(args, metrics=None):
+    """Lease accounts from the shared queue and scrape them until it is drained."""
+    from cams_lease import LeaseQueue
+    from cams_pipeline import Pipeline
+
+    leases = LeaseQueue(args.queue, args.lease_seconds)
+    worker = f"{socket.gethostname()}-{os.getpid()}"
+    factory, selectors, cache, artifacts = build_session_factory(args)
+    factory = functools.partial(factory, vehicles=leases.meta("vehicles", True))
+
+    def session_factory(label="main"):
+        # Workers on one host share the session store; each needs CAMS sessions of its own.
+        return factory(f"{worker}/{label}")
+
+    stop = threading.Event()
+
+    def heartbeat():
+        while not stop.wait(args.lease_seconds / 3):
+            leases.renew(worker)
+
+    def on_result(index, acct, data):
+        leases.complete(worker, acct, data)
+
+    log.info(f"Worker {worker} leasing from {args.queue}")
+    # A source queue as small as the session count keeps this worker from
+    # leasing accounts it can't start on yet. Once its sessions are gone it
+    # stops leasing, and whatever it still holds goes back to the queue.
+    scraped = threading.Event()
+    pipeline = Pipeline(leases.stream(worker, poll=args.poll, stop=scraped), session_factory, workers=args.workers,
+                        on_result=on_result, max_retries=args.max_retries, queue_size=args.workers,
+                        recycler=build_recycler(args), abandon=False, stop=scraped)
+    renewer = threading.Thread(target=heartbeat, name="lease-heartbeat", daemon=True)
+    renewer.start()
+    released = 0
     try:
-        results_df = pd.DataFrame([r for r in results if r.get("Status") == "Success"])
-        results_df = results_df.drop(columns=["Status"], errors='ignore')
-        if "ENDO DATE" in results_df.columns:
-            results_df["ENDO DATE"] = pd.to_datetime(results_df["ENDO DATE"], errors='coerce').dt.strftime("%m/%d/%Y")
-        if "NEW_PULLOUT_DATE" in results_df.columns:
-            results_df["NEW_PULLOUT_DATE"] = pd.to_datetime(results_df["NEW_PULLOUT_DATE"], errors='coerce').dt.strftime("%m/%d/%Y")
-        fallback_filename = f"psb_auto-fallback-{timestamp}.xlsx"
-        results_df.to_excel(fallback_filename, index=False)
-        print(f"Fallback file saved: {fallback_filename}")
-    except Exception as fallback_error:
-        print(f"Fallback save also failed: {fallback_error}")
-
-print("\n Process completed!")
-#input("Press ENTER to close the browser...")
-driver.quit()
+        pipeline.run()
+    except SessionError as e:
+        print(f"Could not start a session: {e}")
+        exit(1)
+    finally:
+        stop.set()
+        released = leases.release(worker)
+        if released:
+            log.error(f"Returned {released} unfinished accounts to {args.queue} for other workers")
+        close_shared(selectors, cache, artifacts)
+        leases.close()
+        if not args.no_session_reuse:
+            # Labels carry this process id, so nobody can reuse them after it exits.
+            CookieStore(args.session_store).forget_prefix(f"{worker}/")
+    print_summary(pipeline.statuses, pipeline.errors)
+    if metrics is not None:
+        metrics.report()
+    if released:
+        exit(1)
+
+
+def main(argv=None):
+    startup = StepTimer()
+    startup.steps["imports"] = [IMPORTED - STARTED]
+    args = parse_args(argv)
+    metrics = configure_logging(args.log_level, args.events, args.events_level, args.metrics_port)
+    if args.queue and args.coordinate:
+        return coordinate(args)
+    if args.queue:
+        return work_queue(args, metrics)
+    startup.lap("arguments")
+
+    source = open_input(args.input)
+    startup.lap("input")
+    session_factory, selectors, cache, artifacts = build_session_factory(args, startup)
+    startup.lap("session setup")
+
+    journal = Journal(args.journal or default_journal_path(args.input))
+    done = journal.load() if args.resume else {}
+    if done:
+        log.info(f"Resuming from {journal.path}: {len(done)} accounts already done")
+    startup.lap("journal")
+
+    sinks = open_sinks(args)
+    session_factory = functools.partial(session_factory, vehicles=wants_vehicles(sinks))
+    startup.lap("outputs")
+
+    first_record = []
+
+    def on_result(index, acct, data):
+        if not first_record:
+            first_record.append(time.perf_counter())
+        # Errors stay out of the journal so a resumed run tries them again.
+        if data["Status"] != STATUS_ERROR:
+            journal.append(acct, data)
+
+    from cams_pipeline import Pipeline
+    pipeline = Pipeline(source, session_factory, sinks=sinks, workers=args.workers, done=done,
+                        on_result=on_result, max_retries=args.max_retries, recycler=build_recycler(args))
+    journal.open(resume=args.resume)
+    try:
+        pipeline.run()
+    except SessionError as e:
+        print(f"Could not start a session: {e}")
+        exit(1)
+    finally:
+        journal.close()
+        close_shared(selectors, cache, artifacts)
+
+    if close_sinks(sinks):
+        if pipeline.statuses[STATUS_ERROR]:
+            log.info(f"Keeping {journal.path} so --resume retries the {pipeline.statuses[STATUS_ERROR]} failed accounts")
+        else:
+            journal.discard()
+
+    source.report()
+    print_summary(pipeline.statuses, pipeline.errors)
+    metrics.report()
+    if args.profile_startup:
+        report_startup(startup, pipeline.timer, first_record)
+
+    print("\n Process completed!")
+
+
+if __name__ == "__main__":
+    # cams_http and cams_pipeline "import cams"; hand them this module rather
+    # than a second copy, so SessionError and friends are the same classes.
+    sys.modules.setdefault("cams", sys.modules[__name__])
+    main()
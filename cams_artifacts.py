@@ -0,0 +1,143 @@
+"""Failure screenshots and page dumps, written off the scraping threads.
+
+A session that hits a miss hands the page to ``ArtifactWriter.capture``,
+which only reads the page from the browser and queues it; a background
+thread gzips the HTML, writes the PNG and appends a line to
+``index.jsonl`` linking the files to the account and failure reason.
+
+During a CAMS outage hundreds of accounts fail on the same error page, so
+captures are deduplicated by a hash of the page HTML: a repeat only adds
+an index line pointing at the first copy, without taking a screenshot.
+Each run gets its own folder and stops saving new pages once it holds
+``max_count`` artifacts or ``max_mb`` megabytes; repeats are still indexed. When the writer falls
+behind, new captures are dropped rather than slowing the run down.
+"""
+import datetime
+import gzip
+import hashlib
+import json
+import logging
+import os
+import queue
+import re
+import threading
+
+log = logging.getLogger("cams.artifacts")
+
+DEFAULT_ARTIFACT_DIR = "artifacts"
+DEFAULT_MAX_COUNT = 200
+DEFAULT_MAX_MB = 100
+
+_END = object()
+
+
+def _safe(text):
+    return re.sub(r"[^\w.-]+", "_", text)
+
+
+class ArtifactWriter:
+    """Captures failure pages into a per-run folder under `directory`. Thread-safe; `close()` when done."""
+
+    def __init__(self, directory=DEFAULT_ARTIFACT_DIR, max_count=DEFAULT_MAX_COUNT, max_mb=DEFAULT_MAX_MB,
+                 queue_size=32):
+        self.path = os.path.join(directory, datetime.datetime.now().strftime("%Y%m%d-%H%M%S"))
+        self.max_count = max_count
+        self.max_bytes = max_mb * 1024 * 1024
+        self.count = 0
+        self.bytes = 0
+        self.duplicates = 0
+        self.dropped = 0
+        self.seen = {}
+        self.lock = threading.Lock()
+        self.queue = queue.Queue(queue_size)
+        self._thread = None
+        self._index = None
+
+    def _full(self):
+        return self.count >= self.max_count or self.bytes >= self.max_bytes
+
+    def capture_page(self, driver, kind, acct=None, reason=None, screenshot=True):
+        """Queue the page `driver` is on; never raises, so it is safe inside error handling."""
+        try:
+            html = driver.page_source
+            with self.lock:
+                # Repeats and over-budget pages never need the (slow) screenshot.
+                wanted = screenshot and self._digest(html) not in self.seen and not self._full()
+            png = driver.get_screenshot_as_png() if wanted else None
+        except Exception as e:
+            log.warning(f"Could not capture {kind} page: {e}")
+            return
+        self.capture(kind, html, png, acct, reason)
+
+    def capture(self, kind, html, png=None, acct=None, reason=None):
+        """Queue one artifact: page `html` plus an optional screenshot as PNG bytes."""
+        digest = self._digest(html)
+        entry = {
+            "time": datetime.datetime.now().isoformat(timespec="seconds"),
+            "kind": kind,
+            "account": acct,
+            "reason": reason,
+            "sha1": digest,
+        }
+        with self.lock:
+            if digest in self.seen:
+                self.duplicates += 1
+                entry["duplicate_of"] = self.seen[digest]
+                html = png = None
+            elif self._full():
+                self.dropped += 1
+                return
+            else:
+                self.count += 1
+                name = f"{self.count:04d}_{_safe(kind)}" + (f"_{_safe(acct)}" if acct else "")
+                self.seen[digest] = name
+                entry["name"] = name
+            if self._thread is None:
+                os.makedirs(self.path, exist_ok=True)
+                self._index = open(os.path.join(self.path, "index.jsonl"), "a", encoding="utf-8")
+                self._thread = threading.Thread(target=self._run, name="artifact-writer", daemon=True)
+                self._thread.start()
+        try:
+            self.queue.put_nowait((entry, html, png))
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+
+    @staticmethod
+    def _digest(html):
+        return hashlib.sha1(html.encode("utf-8", "replace")).hexdigest()
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is _END:
+                return
+            entry, html, png = item
+            try:
+                if html is not None:
+                    files = [f"{entry['name']}.html.gz"]
+                    with gzip.open(os.path.join(self.path, files[0]), "wt", encoding="utf-8", compresslevel=6) as f:
+                        f.write(html)
+                    if png:
+                        files.append(f"{entry['name']}.png")
+                        with open(os.path.join(self.path, files[1]), "wb") as f:
+                            f.write(png)
+                    entry["files"] = files
+                    written = sum(os.path.getsize(os.path.join(self.path, name)) for name in files)
+                    with self.lock:
+                        self.bytes += written
+                self._index.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                self._index.flush()
+            except OSError as e:
+                log.error(f"Could not write failure artifact {entry.get('name', entry['kind'])}: {e}")
+
+    def close(self):
+        """Write out whatever is queued and report what was captured."""
+        if self._thread is None:
+            return
+        self.queue.put(_END)
+        self._thread.join()
+        self._index.close()
+        print(f"Failure artifacts: {self.count} saved to {self.path}"
+              + (f", {self.duplicates} duplicate pages indexed only" if self.duplicates else "")
+              + (f", {self.dropped} skipped over budget or while the writer was busy" if self.dropped else ""))
@@ -0,0 +1,258 @@
+"""Offline benchmarks for the CAMS scraper.
+
+    python cams_bench.py run --accounts 200 --workers 2 --latency .2 --save before.json
+    python cams_bench.py run --accounts 200 --workers 2 --latency .2 --compare before.json
+    python cams_bench.py profiles --loads 20
+
+``run`` serves N synthetic accounts from a local ``fake_cams`` site with
+the given latency and failure rate, scrapes them with either backend and
+reports accounts per minute, p50/p95 per step and peak memory. ``--save``
+keeps the numbers as JSON and ``--compare`` prints the change against a
+saved run, so a performance change can be checked for regressions.
+
+``profiles`` starts one Chrome per browser profile (see
+``cams.BROWSER_PROFILES``), loads the same page repeatedly and reports
+start-up time, page-load latency and the resident memory of the whole
+browser process tree. It targets ``--url`` when given, otherwise a local
+``fake_cams`` site, so it never needs production credentials.
+"""
+import argparse
+import contextlib
+import functools
+import io
+import json
+import statistics
+import threading
+import time
+
+import cams
+from cams_recycle import browser_rss_mb
+from cams_telemetry import configure as configure_logging
+from fake_cams import FakeCams, make_accounts
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+class MemorySampler:
+    """Tracks peak RSS of this process plus its children (the browsers) while running.
+
+    Without psutil it falls back to the OS high-water marks from
+    getrusage, which miss Chrome processes that are still alive.
+    """
+
+    def __init__(self, interval=.25):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="memory-sampler", daemon=True)
+
+    def _sample(self):
+        root = psutil.Process()
+        total = 0
+        for process in [root] + root.children(recursive=True):
+            try:
+                total += process.memory_info().rss
+            except psutil.Error:
+                pass
+        self.peak_mb = max(self.peak_mb, total / (1024 * 1024))
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._sample()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if psutil is not None:
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if psutil is not None:
+            self._stop.set()
+            self._thread.join()
+            return self.peak_mb
+        try:
+            import resource
+        except ImportError:
+            return None
+        # ru_maxrss is in kilobytes on Linux.
+        own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        return (own + children) / 1024
+
+
+def run_accounts(args):
+    accounts = make_accounts(args.accounts, seed=args.seed)
+    site = FakeCams(accounts, latency=args.latency, jitter=args.jitter, asset_latency=args.asset_latency,
+                    failure_rate=args.failure_rate, seed=args.seed).start()
+    # The browser backend reads its target from the module settings.
+    cams.CAMS_URL, cams.USERNAME, cams.PASSWORD = site.url, site.username, site.password
+
+    if args.backend == "http":
+        from cams_http import HttpSession
+        factory = functools.partial(HttpSession, url=site.url, username=site.username, password=site.password)
+    else:
+        factory = functools.partial(cams.BrowserSession, profile=args.profile)
+
+    outcomes = {"ok": 0, "failed": 0}
+    lock = threading.Lock()
+
+    def on_result(index, acct, data):
+        with lock:
+            outcomes["ok" if data["Status"] == cams.STATUS_SUCCESS else "failed"] += 1
+
+    # The scraper logs through the cams loggers; only its end-of-run reports go to stdout.
+    configure_logging("info" if args.verbose else "critical")
+    log = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    sampler = MemorySampler().start()
+    started = time.perf_counter()
+    try:
+        with log:
+            items = ((index, acct, {}) for index, acct in enumerate(accounts))
+            if args.workers > 1:
+                timer = cams.run_worker_pool(items, args.workers, factory, on_result)
+            else:
+                timer = cams.run_sequential(items, factory, on_result)
+    finally:
+        elapsed = time.perf_counter() - started
+        peak_mb = sampler.stop()
+        site.stop()
+
+    result = {
+        "backend": args.backend,
+        "profile": args.profile,
+        "workers": args.workers,
+        "accounts": args.accounts,
+        "latency": args.latency,
+        "failure_rate": args.failure_rate,
+        "ok": outcomes["ok"],
+        "failed": outcomes["failed"],
+        "elapsed": elapsed,
+        "accounts_per_minute": outcomes["ok"] / elapsed * 60 if elapsed else 0.0,
+        "peak_rss_mb": peak_mb,
+        "steps": {step: {"p50": stats["p50"], "p95": stats["p95"], "count": stats["count"]}
+                  for step, stats in timer.summary().items()},
+        "requests": dict(site.requests),
+    }
+    print_run(result)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare_runs(json.load(f), result)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"Saved benchmark to {args.save}")
+
+
+def print_run(result):
+    print(f"{result['accounts']} accounts, backend={result['backend']}, workers={result['workers']}, "
+          f"latency={result['latency']}s, failure rate={result['failure_rate']}")
+    print(f"  scraped:         {result['ok']} ok, {result['failed']} failed in {result['elapsed']:.1f}s")
+    print(f"  throughput:      {result['accounts_per_minute']:.1f} accounts/minute")
+    peak = result["peak_rss_mb"]
+    print(f"  peak memory:     {f'{peak:.0f} MB' if peak is not None else 'n/a'}")
+    print(f"  {'step':<16}{'count':>7}{'p50 s':>9}{'p95 s':>9}")
+    for step, stats in result["steps"].items():
+        print(f"  {step:<16}{stats['count']:>7}{stats['p50']:>9.3f}{stats['p95']:>9.3f}")
+
+
+def _change(before, after):
+    if not before:
+        return "    n/a"
+    return f"{(after - before) / before:+7.1%}"
+
+
+def compare_runs(baseline, result):
+    print("Compared with baseline:")
+    print(f"  throughput       {baseline['accounts_per_minute']:8.1f} -> {result['accounts_per_minute']:8.1f} "
+          f"{_change(baseline['accounts_per_minute'], result['accounts_per_minute'])}")
+    for step, stats in result["steps"].items():
+        before = baseline["steps"].get(step)
+        if before is None:
+            print(f"  {step:<16} new step")
+            continue
+        print(f"  {step:<16} p50 {_change(before['p50'], stats['p50'])}  p95 {_change(before['p95'], stats['p95'])}")
+    for step in baseline["steps"]:
+        if step not in result["steps"]:
+            print(f"  {step:<16} no longer recorded")
+
+
+def bench_profile(profile, url, loads):
+    started = time.perf_counter()
+    driver = cams.create_driver(profile)
+    startup = time.perf_counter() - started
+    try:
+        timings = []
+        for _ in range(loads):
+            started = time.perf_counter()
+            driver.get(url)
+            timings.append(time.perf_counter() - started)
+        rss = browser_rss_mb(driver)
+    finally:
+        driver.quit()
+    return {
+        "profile": profile,
+        "startup": startup,
+        "p50": statistics.median(timings) if timings else 0.0,
+        "p95": cams.percentile(timings, 95),
+        "rss": rss,
+    }
+
+
+def run_profiles(args):
+    site = None
+    url = args.url
+    if not url:
+        site = FakeCams(make_accounts(1)).start()
+        url = f"{site.base_url}/login.aspx"
+    try:
+        rows = [bench_profile(profile, url, args.loads) for profile in args.profile or cams.BROWSER_PROFILES]
+    finally:
+        if site is not None:
+            site.stop()
+
+    print(f"Browser profiles, {args.loads} loads of {url}")
+    print(f"  {'profile':<10}{'startup s':>11}{'p50 load s':>12}{'p95 load s':>12}{'RSS MB':>10}")
+    for row in rows:
+        rss = f"{row['rss']:.0f}" if row["rss"] is not None else "n/a"
+        print(f"  {row['profile']:<10}{row['startup']:>11.2f}{row['p50']:>12.3f}{row['p95']:>12.3f}{rss:>10}")
+    if psutil is None:
+        print("  (install psutil to measure RSS)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the CAMS scraper.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="scrape synthetic accounts from a local mock CAMS")
+    run.add_argument("--accounts", type=int, default=50, help="synthetic accounts to scrape (default: 50)")
+    run.add_argument("--backend", choices=["browser", "http"], default="browser")
+    run.add_argument("--profile", choices=cams.BROWSER_PROFILES, default="lean")
+    run.add_argument("--workers", type=int, default=1)
+    run.add_argument("--latency", type=float, default=0.0, help="seconds added to every page (default: 0)")
+    run.add_argument("--jitter", type=float, default=0.0, help="+/- fraction of latency to vary by (default: 0)")
+    run.add_argument("--asset-latency", type=float, default=0.0, help="seconds added to every CSS/image (default: 0)")
+    run.add_argument("--failure-rate", type=float, default=0.0, help="share of account pages answered with HTTP 500")
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--save", help="write the results as JSON")
+    run.add_argument("--compare", help="baseline JSON from an earlier --save to diff against")
+    run.add_argument("--verbose", action="store_true", help="show the scraper's own output, one line per account")
+    run.set_defaults(func=run_accounts)
+
+    profiles = commands.add_parser("profiles", help="compare browser profiles on page-load latency and memory")
+    profiles.add_argument("--url", help="page to load (default: the login page of a local fake CAMS)")
+    profiles.add_argument("--loads", type=int, default=20, help="page loads per profile (default: 20)")
+    profiles.add_argument("--profile", action="append", choices=cams.BROWSER_PROFILES,
+                          help="profile to include; repeat for several (default: all)")
+    profiles.set_defaults(func=run_profiles)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""On-disk cache of slow-changing account fields between runs.
+
+The same account list is scraped several times a day, but names,
+addresses and the collateral block rarely change. Fields are cached per
+group, each with its own TTL, in a small SQLite file keyed by account
+number. A fresh ``collateral`` group lets the scraper skip the whole
+Account Details -> Collateral -> DetailLink navigation; volatile columns
+(``OB``, ``DPD``, ``REM STAT``) are never cached and are always read
+live. The file is capped at ``max_accounts`` accounts, evicting the least
+recently used.
+"""
+import json
+import sqlite3
+import threading
+import time
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# group name -> (output columns, time to live in seconds)
+CACHE_GROUPS = {
+    "identity": (["ACCOUNT NAME", "PRIMARY ADDRESS", "SECONDARY ADDRESS", "MOBILE #"], DAY),
+    "collateral": (["COLOR", "PLATE #", "SERIAL #", "ENGINE #", "UNIT DESCRIPTION"], 7 * DAY),
+}
+
+DEFAULT_CACHE_PATH = "cams_cache.sqlite3"
+DEFAULT_MAX_ACCOUNTS = 50_000
+
+# Check the size bound after this many writes rather than on every one.
+_EVICT_EVERY = 100
+
+
+class ResultCache:
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_accounts=DEFAULT_MAX_ACCOUNTS, refresh=False, groups=None):
+        self.path = path
+        self.max_accounts = max_accounts
+        self.refresh = refresh
+        self.groups = groups or CACHE_GROUPS
+        self.lock = threading.Lock()
+        self.hits = {group: 0 for group in self.groups}
+        self.misses = {group: 0 for group in self.groups}
+        self._writes = 0
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " account TEXT NOT NULL,"
+            " grp TEXT NOT NULL,"
+            " data TEXT NOT NULL,"
+            " fetched_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL,"
+            " PRIMARY KEY (account, grp))"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed_at)")
+        self.db.commit()
+
+    def columns(self, group):
+        return self.groups[group][0]
+
+    def lookup(self, acct):
+        """Return {group: {column: value}} for every group still within its TTL.
+
+        With `refresh` set nothing is served, so every field is scraped again
+        and the cache is rewritten from the fresh values.
+        """
+        if self.refresh:
+            with self.lock:
+                for group in self.groups:
+                    self.misses[group] += 1
+            return {}
+
+        now = time.time()
+        fresh = {}
+        with self.lock:
+            rows = self.db.execute("SELECT grp, data, fetched_at FROM cache WHERE account = ?", (acct,)).fetchall()
+            for group, data, fetched_at in rows:
+                if group in self.groups and now - fetched_at <= self.groups[group][1]:
+                    fresh[group] = json.loads(data)
+            if fresh:
+                self.db.execute("UPDATE cache SET accessed_at = ? WHERE account = ?", (now, acct))
+                self.db.commit()
+            for group in self.groups:
+                if group in fresh:
+                    self.hits[group] += 1
+                else:
+                    self.misses[group] += 1
+        return fresh
+
+    def store(self, acct, record, skip=()):
+        """Cache the groups of `record` that were scraped live.
+
+        Groups listed in `skip` came from the cache and keep their original
+        fetch time; groups with no values at all are not cached, so a failed
+        collateral lookup is retried next run.
+        """
+        now = time.time()
+        rows = []
+        for group, (columns, _) in self.groups.items():
+            if group in skip:
+                continue
+            values = {column: record.get(column, "") for column in columns}
+            if any(values.values()):
+                rows.append((acct, group, json.dumps(values, ensure_ascii=False, default=str), now, now))
+        if not rows:
+            return
+        with self.lock:
+            self.db.executemany("INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)", rows)
+            self.db.commit()
+            self._writes += 1
+            if self._writes % _EVICT_EVERY == 0:
+                self._evict()
+
+    def _evict(self):
+        count = self.db.execute("SELECT COUNT(DISTINCT account) FROM cache").fetchone()[0]
+        excess = count - self.max_accounts
+        if excess <= 0:
+            return
+        self.db.execute(
+            "DELETE FROM cache WHERE account IN ("
+            " SELECT account FROM cache GROUP BY account ORDER BY MAX(accessed_at) LIMIT ?)",
+            (excess,),
+        )
+        self.db.commit()
+
+    def report(self):
+        print("Cache:")
+        for group in self.groups:
+            print(f"  - {group}: {self.hits[group]} hits, {self.misses[group]} misses")
+
+    def close(self):
+        with self.lock:
+            self._evict()
+            self.db.close()
@@ -0,0 +1,79 @@
+"""Saved CAMS login cookies, so a session can skip the credential login.
+
+After a successful login each session saves its cookies here under its
+own label. The next session with that label (in this run or a later one)
+loads them into its browser or HTTP client and checks that ``cams.aspx``
+still shows ``SystemFrame``; only when CAMS has expired them does it go
+through the login form again. Every label keeps its own CAMS session
+because ASP.NET serializes the requests of one session, which would
+undo the parallel workers. ``cams.py --queue`` workers prefix their
+labels with the worker id, since several of them on one host share
+this file.
+
+Entries are tied to the CAMS URL and user they were issued for. The file
+holds live credentials in effect, so it is written owner-only (0600 on
+POSIX; on Windows it inherits the folder's ACL) and replaced atomically.
+"""
+import json
+import os
+import threading
+import time
+
+DEFAULT_COOKIE_PATH = "cams_session.json"
+
+
+class CookieStore:
+
+    def __init__(self, path=DEFAULT_COOKIE_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def _read(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable session store {self.path}: {e}")
+            return {}
+
+    def load(self, label, url, username):
+        """Cookies saved for `label` against the same URL and user, minus any past their expiry; None if there are none."""
+        with self.lock:
+            entry = self._read().get(label)
+        if not entry or entry.get("url") != url or entry.get("username") != username:
+            return None
+        now = time.time()
+        cookies = [cookie for cookie in entry.get("cookies", []) if cookie.get("expiry", now + 1) > now]
+        return cookies or None
+
+    def save(self, label, url, username, cookies):
+        with self.lock:
+            entries = self._read()
+            entries[label] = {"url": url, "username": username, "saved_at": time.time(), "cookies": cookies}
+            self._write(entries)
+
+    def forget(self, label):
+        with self.lock:
+            entries = self._read()
+            if entries.pop(label, None) is not None:
+                self._write(entries)
+
+    def forget_prefix(self, prefix):
+        """Drop every label starting with `prefix`, e.g. a queue worker's sessions when it exits."""
+        with self.lock:
+            entries = self._read()
+            kept = {label: entry for label, entry in entries.items() if not label.startswith(prefix)}
+            if len(kept) != len(entries):
+                self._write(kept)
+
+    def _write(self, entries):
+        # Per process, so workers sharing the store never write the same temporary file.
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entries, f)
+        # os.open only applies the mode when it creates the file.
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,107 @@
+"""Cached chromedriver resolution.
+
+``ChromeDriverManager().install()`` asks the network for the latest
+matching driver on every start, which costs seconds and fails outright
+offline. ``resolve_driver`` instead reads the installed Chrome version
+locally (registry on Windows, ``--version`` elsewhere) and reuses the
+driver recorded in ``cams_driver.json`` while Chrome's major version
+still matches. webdriver_manager is only imported and asked when the
+versions differ, nothing is cached yet, or an update is forced.
+"""
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+DEFAULT_DRIVER_CACHE = "cams_driver.json"
+
+CHROME_BINARIES = [
+    "google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome",
+    "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+]
+
+_VERSION = re.compile(r"\d+(?:\.\d+){1,3}")
+
+_lock = threading.Lock()
+_resolved = {}
+
+
+def _windows_chrome_version():
+    import winreg
+
+    for root in (winreg.HKEY_CURRENT_USER, winreg.HKEY_LOCAL_MACHINE):
+        try:
+            with winreg.OpenKey(root, r"Software\Google\Chrome\BLBeacon") as key:
+                return winreg.QueryValueEx(key, "version")[0]
+        except OSError:
+            continue
+    return None
+
+
+def chrome_version():
+    """Version of the installed Chrome, e.g. "126.0.6478.126", or None when it can't be found."""
+    if sys.platform == "win32":
+        return _windows_chrome_version()
+    for binary in CHROME_BINARIES:
+        path = shutil.which(binary) or (binary if os.path.isfile(binary) else None)
+        if path is None:
+            continue
+        try:
+            output = subprocess.run([path, "--version"], capture_output=True, text=True, timeout=10).stdout
+        except (OSError, subprocess.SubprocessError):
+            continue
+        match = _VERSION.search(output)
+        if match:
+            return match.group(0)
+    return None
+
+
+def _major(version):
+    return version.split(".")[0] if version else None
+
+
+def _read(cache_path):
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable driver cache {cache_path}: {e}")
+        return {}
+
+
+def resolve_driver(cache_path=DEFAULT_DRIVER_CACHE, update=False):
+    """Path to a chromedriver for the installed Chrome, downloading one only when the cached one won't do.
+
+    Resolved once per process and cache file. When Chrome's version
+    cannot be read, a cached driver that still exists is trusted.
+    """
+    with _lock:
+        if cache_path in _resolved and not update:
+            return _resolved[cache_path]
+
+        version = chrome_version()
+        entry = _read(cache_path)
+        cached = entry.get("driver_path")
+        if (not update and cached and os.path.isfile(cached)
+                and (version is None or _major(version) == _major(entry.get("chrome_version")))):
+            _resolved[cache_path] = cached
+            return cached
+
+        if cached and not update:
+            print(f"Chrome {version} does not match the cached driver for {entry.get('chrome_version')}, updating it...")
+        from webdriver_manager.chrome import ChromeDriverManager
+
+        path = ChromeDriverManager().install()
+        try:
+            with open(cache_path, "w", encoding="utf-8") as f:
+                json.dump({"chrome_version": version, "driver_path": path, "resolved_at": time.time()}, f)
+        except OSError as e:
+            print(f"Could not save driver cache {cache_path}: {e}")
+        _resolved[cache_path] = path
+        return path
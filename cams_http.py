@@ -0,0 +1,402 @@
+"""Browserless CAMS backend.
+
+CAMS is an ASP.NET WebForms app, so everything the Selenium flow does by
+clicking can be replayed as plain form posts: each page carries its
+``__VIEWSTATE``/``__EVENTVALIDATION`` hidden fields and links fire
+``__doPostBack(target, argument)``. ``HttpSession`` logs in once, then for
+every account posts the search, follows the result row, reads the account
+labels, opens ``accountcollateral.aspx`` and posts back every unit's
+``DetailLink`` from that grid page. It exposes the same interface as
+``cams.BrowserSession`` so the sequential loop and the worker pool can
+drive either.
+"""
+import logging
+import re
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import cams
+
+log = logging.getLogger("cams.http")
+
+SEARCH_INPUT_ID = "_ctl0_ContentPlaceHolder1_txtSearch"
+SEARCH_BUTTON_ID = "_ctl0_ContentPlaceHolder1_btnSearch"
+
+_POSTBACK_RE = re.compile(r"__doPostBack\(\s*['\"]([^'\"]*)['\"]\s*,\s*['\"]([^'\"]*)['\"]\s*\)")
+_LOCATION_RE = re.compile(r"location(?:\.href)?\s*=\s*['\"]([^'\"]+)['\"]")
+_DETAIL_LINK_RE = re.compile(r"^dg__ctl(\d+)_DetailLink$")
+
+# Elements whose text content is worth keeping when they carry an id.
+_TEXT_TAGS = {"span", "label", "td", "div", "a", "textarea", "p", "b", "font"}
+_VOID_TAGS = {"input", "br", "img", "hr", "meta", "link", "frame", "col", "area", "base"}
+
+
+class Page:
+    """The parts of a CAMS page the scraper needs, parsed once."""
+
+    def __init__(self, url, html):
+        self.url = url
+        self.html = html
+        parser = _PageParser()
+        parser.feed(html)
+        parser.close()
+        self.form_action = parser.form_action
+        self.fields = parser.fields
+        self.buttons = parser.buttons
+        self.names_by_id = parser.names_by_id
+        self.values = parser.values
+        self.links = parser.links
+        self.frames = parser.frames
+        self.rows = parser.rows
+
+    def value(self, ident):
+        value = self.values.get(ident)
+        return value.strip() if value else ""
+
+
+class _PageParser(HTMLParser):
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.form_action = None
+        self.fields = {}
+        self.buttons = {}
+        self.names_by_id = {}
+        self.values = {}
+        self.links = []
+        self.frames = {}
+        self.rows = []
+        self._in_form = False
+        self._open = []
+        self._row = None
+        self._select = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {k: (v or "") for k, v in attrs}
+        ident = attrs.get("id")
+        name = attrs.get("name")
+
+        if tag == "form" and self.form_action is None:
+            self._in_form = True
+            self.form_action = attrs.get("action", "")
+        elif tag in ("frame", "iframe") and name:
+            self.frames[name] = attrs.get("src", "")
+        elif tag == "input":
+            kind = attrs.get("type", "text").lower()
+            value = attrs.get("value", "")
+            if ident:
+                self.values[ident] = value
+                if name:
+                    self.names_by_id[ident] = name
+            if name and self._in_form:
+                if kind in ("submit", "button", "image"):
+                    self.buttons[name] = value
+                elif kind in ("checkbox", "radio"):
+                    if "checked" in attrs:
+                        self.fields[name] = value or "on"
+                else:
+                    self.fields[name] = value
+        elif tag == "select" and name:
+            self._select = name
+            if ident:
+                self.names_by_id[ident] = name
+            if self._in_form:
+                self.fields.setdefault(name, "")
+        elif tag == "option" and self._select and self._in_form:
+            if "selected" in attrs or not self.fields.get(self._select):
+                self.fields[self._select] = attrs.get("value", "")
+        elif tag == "tr":
+            self._row = {"text": [], "actions": []}
+
+        if self._row is not None:
+            for key in ("onclick", "href"):
+                action = attrs.get(key)
+                if action and action != "#":
+                    self._row["actions"].append(action)
+
+        if tag == "a":
+            self.links.append({"id": ident or "", "href": attrs.get("href", ""),
+                               "onclick": attrs.get("onclick", ""), "text": []})
+            self._open.append((tag, ident, self.links[-1]["text"]))
+        elif tag in _TEXT_TAGS and tag not in _VOID_TAGS:
+            self._open.append((tag, ident, []))
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in _VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_data(self, data):
+        for _, _, parts in self._open:
+            parts.append(data)
+        if self._row is not None:
+            self._row["text"].append(data)
+
+    def handle_endtag(self, tag):
+        if tag == "form":
+            self._in_form = False
+        elif tag == "select":
+            self._select = None
+        elif tag == "tr" and self._row is not None:
+            self.rows.append({"text": " ".join("".join(self._row["text"]).split()),
+                              "actions": self._row["actions"]})
+            self._row = None
+
+        for index in range(len(self._open) - 1, -1, -1):
+            if self._open[index][0] == tag:
+                _, ident, parts = self._open.pop(index)
+                if ident and ident not in self.values:
+                    self.values[ident] = "".join(parts)
+                break
+
+    def close(self):
+        super().close()
+        for link in self.links:
+            link["text"] = " ".join("".join(link["text"]).split())
+
+
+def _disable_insecure_warnings():
+    # Chrome runs with --ignore-certificate-errors against the same host.
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+
+class HttpSession:
+    """A logged-in CAMS session driven over HTTP instead of Chrome."""
+
+    def __init__(self, label="main", url=None, username=None, password=None, timeout=30, cache=None, cookies=None,
+                 vehicles=True, artifacts=None):
+        self.label = label
+        self.artifacts = artifacts
+        self.url = url or cams.CAMS_URL
+        self.username = username if username is not None else cams.USERNAME
+        self.password = password if password is not None else cams.PASSWORD
+        self.timeout = timeout
+        self.http = None
+        self.search_page = None
+        self.cache = cache
+        self.cookies = cookies
+        self.vehicles = vehicles
+        self.timer = cams.StepTimer()
+
+    def start(self):
+        _disable_insecure_warnings()
+        self.http = requests.Session()
+        self.http.verify = False
+        retries = Retry(total=2, backoff_factor=.3, status_forcelist=(502, 503, 504),
+                        allowed_methods=frozenset(["GET"]))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=retries)
+        self.http.mount("http://", adapter)
+        self.http.mount("https://", adapter)
+
+        self.timer.restart()
+        try:
+            if not self.restore_login():
+                self.login()
+            self.timer.lap("login")
+            self.search_page = self.open_search_page()
+            self.timer.lap("frame")
+            if self.cookies is not None:
+                self.cookies.save(self.label, self.url, self.username, [
+                    {"name": c.name, "value": c.value, "domain": c.domain, "path": c.path, "secure": c.secure,
+                     **({"expiry": c.expires} if c.expires else {})}
+                    for c in self.http.cookies
+                ])
+        except Exception:
+            self.quit()
+            raise
+        cams.emit_session_start(self)
+        return self
+
+    def get(self, url):
+        response = self.http.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        return Page(response.url, response.text)
+
+    def submit(self, page, extra):
+        """Post `page`'s form back with its hidden state plus `extra` fields."""
+        data = dict(page.fields)
+        data.update(extra)
+        response = self.http.post(urljoin(page.url, page.form_action or ""), data=data, timeout=self.timeout)
+        response.raise_for_status()
+        return Page(response.url, response.text)
+
+    def postback(self, page, target, argument=""):
+        return self.submit(page, {"__EVENTTARGET": target, "__EVENTARGUMENT": argument})
+
+    def follow(self, page, action):
+        """Run a link's href/onclick the way the browser would."""
+        match = _POSTBACK_RE.search(action)
+        if match:
+            return self.postback(page, match.group(1), match.group(2))
+        match = _LOCATION_RE.search(action)
+        if match:
+            return self.get(urljoin(page.url, match.group(1)))
+        if not action.lower().startswith("javascript:"):
+            return self.get(urljoin(page.url, action))
+        return None
+
+    def restore_login(self):
+        """Load this label's saved cookies and check cams.aspx still shows SystemFrame."""
+        if self.cookies is None:
+            return False
+        saved = self.cookies.load(self.label, self.url, self.username)
+        if not saved:
+            return False
+        for cookie in saved:
+            self.http.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain", ""),
+                                  path=cookie.get("path", "/"), secure=cookie.get("secure", False))
+        if "SystemFrame" in self.get(self.url).frames:
+            log.info(f"[{self.label}] Reused saved session, skipping login")
+            return True
+        log.info(f"[{self.label}] Saved session has expired, logging in again")
+        self.http.cookies.clear()
+        self.cookies.forget(self.label)
+        return False
+
+    def login(self):
+        log.debug(f"[{self.label}] Opening login page over HTTP...")
+        page = self.get(self.url)
+        if "LoginID" not in page.names_by_id:
+            log.debug(f"[{self.label}] Already authenticated")
+            return
+
+        extra = {
+            page.names_by_id["LoginID"]: self.username or "",
+            page.names_by_id["txtPassword"]: self.password or "",
+        }
+        button = page.names_by_id.get("cmdLogin")
+        if button:
+            extra[button] = page.buttons.get(button, "")
+        page = self.submit(page, extra)
+        if "LoginID" in page.names_by_id:
+            raise cams.SessionError("Login rejected - still on the login form")
+        log.info(f"[{self.label}] Logged in")
+
+    def open_search_page(self):
+        page = self.get(self.url)
+        if "LoginID" in page.names_by_id:
+            raise cams.SessionError("Not authenticated after login")
+        if "SystemFrame" in page.frames:
+            page = self.get(urljoin(page.url, page.frames["SystemFrame"]))
+        if SEARCH_INPUT_ID not in page.names_by_id or SEARCH_BUTTON_ID not in page.names_by_id:
+            if self.artifacts is not None:
+                self.artifacts.capture("missing_search_elements", page.html, reason="search elements missing")
+            raise cams.SessionError("Search elements not found in SystemFrame")
+        return page
+
+    def search(self, acct):
+        page = self.search_page
+        button = page.names_by_id[SEARCH_BUTTON_ID]
+        return self.submit(page, {
+            page.names_by_id[SEARCH_INPUT_ID]: acct,
+            button: page.buttons.get(button, ""),
+        })
+
+    def open_result(self, page, acct):
+        for row in page.rows:
+            if acct in row["text"]:
+                for action in row["actions"]:
+                    opened = self.follow(page, action)
+                    if opened is not None:
+                        return opened
+        return None
+
+    def process_account(self, acct, manual):
+        timer = self.timer
+        timer.restart()
+        try:
+            try:
+                page = self.search(acct)
+            except requests.RequestException:
+                # The cached search form may have gone stale; fetch a fresh one once.
+                self.search_page = self.open_search_page()
+                page = self.search(acct)
+            timer.lap("search")
+
+            page = self.open_result(page, acct)
+            timer.lap("result")
+            if page is None:
+                log.info(f"[{self.label}] Account {acct} not found in search results")
+                return cams.failed_record(acct, cams.STATUS_NOT_FOUND, "not in search results")
+
+            scraped = {column: page.value(ident) for ident, column in cams.ACCOUNT_FIELDS.items()}
+            data = cams.build_record(acct, manual, scraped)
+            timer.lap("extract")
+
+            if not any(scraped.values()):
+                log.warning(f"[{self.label}] No basic account information found for {acct}")
+                if self.artifacts is not None:
+                    self.artifacts.capture("no_account_info", page.html, acct=acct, reason="no account information")
+                return cams.failed_record(acct, cams.STATUS_ERROR, "no account information")
+
+            # Account page fields cost nothing extra here, so only the
+            # collateral walk is worth serving from the cache.
+            cached = self.cache.lookup(acct) if self.cache else {}
+            if not self.vehicles:
+                pass
+            elif "collateral" in cached:
+                data.update(cached["collateral"])
+                log.debug(f"[{self.label}] Using cached vehicle details for {acct}")
+            else:
+                self.add_vehicle_details(page, acct, data)
+
+            if self.cache:
+                self.cache.store(acct, data, skip=[group for group in cached if group == "collateral"])
+
+            log.debug(f"[{self.label}] Successfully processed account: {acct}")
+            return data
+
+        except Exception as e:
+            log.warning(f"[{self.label}] Error processing account {acct}: {str(e)}")
+            return cams.failed_record(acct, cams.STATUS_ERROR, type(e).__name__)
+
+    def add_vehicle_details(self, page, acct, data):
+        collateral = next((link for link in page.links if "accountcollateral.aspx" in link["href"].lower()), None)
+        if collateral is None:
+            log.warning(f"[{self.label}] Collateral link not found for {acct}")
+            return
+
+        page = self.get(urljoin(page.url, collateral["href"]))
+        self.timer.lap("collateral")
+
+        detail_links = [link for link in page.links if _DETAIL_LINK_RE.match(link["id"])]
+        if not detail_links:
+            log.warning(f"[{self.label}] Vehicle detail link not found for {acct}")
+            return
+
+        # Every unit's postback is replayed from the same grid page, whose
+        # form state stays valid, so the grid is fetched only once.
+        units = []
+        for link in sorted(detail_links, key=lambda link: int(_DETAIL_LINK_RE.match(link["id"]).group(1))):
+            detail = self.follow(page, link["href"] or link["onclick"])
+            self.timer.lap("vehicle_nav")
+            if detail is None:
+                log.warning(f"[{self.label}] Vehicle detail link {link['id']} not followable for {acct}")
+                continue
+            units.append({column: detail.value(ident) for ident, column in cams.VEHICLE_FIELDS.items()})
+            self.timer.lap("vehicle_extract")
+        if not units:
+            return
+
+        data.update(cams.merge_units(units))
+        if any(value for unit in units for value in unit.values()):
+            log.debug(f"[{self.label}] Vehicle details extracted for {acct}" + (f" ({len(units)} units)" if len(units) > 1 else ""))
+        else:
+            log.info(f"[{self.label}] No vehicle details found for {acct}")
+
+    def is_alive(self):
+        return self.http is not None
+
+    def kill(self):
+        """Drop the connection pool from the watchdog thread; the stuck account then fails and is retried."""
+        self.quit()
+
+    def quit(self):
+        if self.http is not None:
+            self.http.close()
+            self.http = None
@@ -0,0 +1,210 @@
+"""Streaming account list reader.
+
+``AccountSource`` reads account numbers lazily from an ``.xlsx`` sheet, a
+``.csv`` file or a plain text list (one account per line), so scraping
+can start while the rest of the file is still being read. Account
+numbers are normalised and deduplicated; duplicates, blanks and numbers
+Excel stored as numbers are counted and reported. The date columns are
+parsed a batch of rows at a time, each distinct value once, and every
+account comes out as ``(acct, manual)`` where ``manual`` holds only the
+input columns that go into the output record.
+"""
+import collections
+import csv
+import datetime
+import logging
+import os
+
+log = logging.getLogger("cams.input")
+
+ACCOUNT_COLUMN = "ACCOUNT NO"
+MANUAL_COLUMNS = ["AGENT", "ENDO DATE", "PLACEMENT", "NEW_PULLOUT_DATE"]
+DATE_COLUMNS = ["ENDO DATE", "NEW_PULLOUT_DATE"]
+DATE_FORMAT = "%m/%d/%Y"
+
+# Formats tried, in order, for dates typed as text.
+DATE_INPUT_FORMATS = [
+    "%m/%d/%Y", "%m/%d/%y", "%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%Y/%m/%d",
+    "%m-%d-%Y", "%d-%b-%Y", "%d %b %Y", "%b %d, %Y", "%B %d, %Y",
+]
+
+# Rows read before their dates are parsed together.
+BATCH_SIZE = 500
+
+# Day zero of Excel's serial date numbers (with its 1900 leap-year bug).
+_EXCEL_EPOCH = datetime.datetime(1899, 12, 30)
+
+
+def normalize_account(value):
+    """Account number as text: whitespace removed, floats like 1388.0 back to digits; "" for blanks."""
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        if value != value:
+            return ""
+        if value.is_integer():
+            value = int(value)
+    return "".join(str(value).split())
+
+
+def parse_date(value):
+    """MM/DD/YYYY for a date, datetime, Excel serial or recognised text; None when it can't be read."""
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.strftime(DATE_FORMAT)
+    if isinstance(value, (int, float)):
+        return (_EXCEL_EPOCH + datetime.timedelta(days=value)).strftime(DATE_FORMAT)
+    text = str(value).strip()
+    for fmt in DATE_INPUT_FORMATS:
+        try:
+            return datetime.datetime.strptime(text, fmt).strftime(DATE_FORMAT)
+        except ValueError:
+            continue
+    try:
+        return datetime.datetime.fromisoformat(text).strftime(DATE_FORMAT)
+    except ValueError:
+        return None
+
+
+def _blank(value):
+    return value is None or (isinstance(value, float) and value != value) or str(value).strip() == ""
+
+
+def _header_key(value):
+    return " ".join(str(value).split()).upper() if value is not None else ""
+
+
+class AccountSource:
+    """Iterable of unique (acct, manual) pairs from `path`, read lazily.
+
+    Opening checks the file type and header straight away, so a bad input
+    fails before any browser starts. Iterate once.
+    """
+
+    def __init__(self, path, batch_size=BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self.rows = 0
+        self.accounts = 0
+        self.blank = 0
+        self.numeric = 0
+        self.duplicates = collections.Counter()
+        self.bad_dates = collections.Counter()
+        self._seen = set()
+
+        ext = os.path.splitext(path)[1].lower()
+        if ext in (".xlsx", ".xlsm"):
+            self._rows = self._xlsx_rows()
+        elif ext == ".csv":
+            self._rows = self._csv_rows()
+        elif ext in (".txt", ".lst", ""):
+            self._rows = self._text_rows()
+        else:
+            raise ValueError(f"Unsupported input file type {ext!r}; use .xlsx, .csv or .txt")
+        # Run the generator up to its first yield so the header is validated now.
+        next(self._rows, None)
+
+    def _columns(self, header):
+        columns = {}
+        for position, name in enumerate(header):
+            key = _header_key(name)
+            if key in (ACCOUNT_COLUMN, *MANUAL_COLUMNS) and key not in columns:
+                columns[key] = position
+        if ACCOUNT_COLUMN not in columns:
+            raise ValueError(f"{self.path} has no 'Account No' column (found: {[name for name in header if name]})")
+        return columns
+
+    def _pick(self, columns, values):
+        return {key: values[position] if position < len(values) else None for key, position in columns.items()}
+
+    def _xlsx_rows(self):
+        import openpyxl
+
+        workbook = openpyxl.load_workbook(self.path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            columns = self._columns(next(rows, ()))
+            yield None
+            for values in rows:
+                yield self._pick(columns, values)
+        finally:
+            workbook.close()
+
+    def _csv_rows(self):
+        with open(self.path, "r", encoding="utf-8-sig", newline="") as f:
+            rows = csv.reader(f)
+            columns = self._columns(next(rows, []))
+            yield None
+            for values in rows:
+                yield self._pick(columns, values)
+
+    def _text_rows(self):
+        with open(self.path, "r", encoding="utf-8-sig") as f:
+            yield None
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#") or _header_key(line) == ACCOUNT_COLUMN:
+                    continue
+                yield {ACCOUNT_COLUMN: line}
+
+    def _batches(self):
+        batch = []
+        for row in self._rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _parse_dates(self, batch):
+        """Rewrite each date column of `batch` in place, parsing every distinct value once."""
+        for column in DATE_COLUMNS:
+            parsed = {}
+            for row in batch:
+                value = row.get(column)
+                if _blank(value):
+                    row[column] = ""
+                    continue
+                key = (type(value), value)
+                if key not in parsed:
+                    parsed[key] = parse_date(value)
+                    if parsed[key] is None:
+                        log.warning(f"Invalid {column} format for {normalize_account(row.get(ACCOUNT_COLUMN))}: {value}")
+                if parsed[key] is None:
+                    self.bad_dates[column] += 1
+                row[column] = parsed[key] if parsed[key] is not None else str(value)
+
+    def __iter__(self):
+        for batch in self._batches():
+            self._parse_dates(batch)
+            for row in batch:
+                self.rows += 1
+                raw = row.get(ACCOUNT_COLUMN)
+                acct = normalize_account(raw)
+                if not acct:
+                    self.blank += 1
+                    continue
+                if acct in self._seen:
+                    self.duplicates[acct] += 1
+                    continue
+                self._seen.add(acct)
+                if isinstance(raw, (int, float)):
+                    self.numeric += 1
+                self.accounts += 1
+                yield acct, {column: "" if _blank(row.get(column)) else row[column]
+                             for column in MANUAL_COLUMNS if column in row}
+
+    def report(self):
+        print(f"📋 Read {self.rows} rows from {self.path}: {self.accounts} accounts")
+        if self.blank:
+            print(f"  - {self.blank} rows without an account number skipped")
+        if self.duplicates:
+            print(f"  - {sum(self.duplicates.values())} duplicate rows skipped (first occurrence kept):")
+            for acct, extra in self.duplicates.most_common(20):
+                print(f"      {acct} x {extra + 1}")
+            if len(self.duplicates) > 20:
+                print(f"      ... and {len(self.duplicates) - 20} more")
+        if self.numeric:
+            print(f"  - {self.numeric} account numbers were stored as numbers; check for lost leading zeros")
+        for column, count in self.bad_dates.items():
+            print(f"  - {count} rows with an unreadable {column} kept as typed")
@@ -0,0 +1,64 @@
+"""Append-only checkpoint journal for long scraping runs.
+
+Every finished account record is written as one JSON line and fsynced
+before the loop moves on, so a crashed or interrupted run loses at most
+the account that was in flight. ``--resume`` reads the journal back and
+only the accounts missing from it are scraped again.
+"""
+import json
+import os
+import threading
+
+
+def default_journal_path(input_path):
+    stem, _ = os.path.splitext(input_path)
+    return f"{stem}.journal.jsonl"
+
+
+class Journal:
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = None
+
+    def load(self):
+        """Return {account number: record} for every complete journal line."""
+        done = {}
+        if not os.path.exists(self.path):
+            return done
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                    done[entry["account"]] = entry["record"]
+                except (ValueError, KeyError, TypeError):
+                    # A crash mid-write leaves a torn last line; that account just gets scraped again.
+                    print(f"Ignoring unreadable journal line {line_no} in {self.path}")
+        return done
+
+    def open(self, resume=False):
+        if not resume and os.path.exists(self.path):
+            print(f"Starting a new journal, discarding previous {self.path}")
+        self.file = open(self.path, "a" if resume else "w", encoding="utf-8")
+        return self
+
+    def append(self, acct, record):
+        line = json.dumps({"account": acct, "record": record}, ensure_ascii=False, default=str)
+        with self.lock:
+            self.file.write(line + "\n")
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def discard(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,184 @@
+"""Shared account queue for spreading one run over several machines.
+
+A coordinator loads the account list into a SQLite file on a share that
+every machine can reach. Worker processes (``cams.py --queue FILE``,
+any number per host) lease accounts a few at a time, scrape them and
+write the records back. A lease that is not completed or renewed within
+its time to live, because the worker crashed or its machine went away,
+is handed to the next worker that asks. Once nothing is pending or
+leased, the coordinator reads the records back in input order and writes
+the workbook.
+
+Every change runs in its own ``BEGIN IMMEDIATE`` transaction with a long
+busy timeout, and the file stays in rollback-journal mode, because WAL
+does not work over network file systems.
+"""
+import json
+import sqlite3
+import threading
+import time
+
+DEFAULT_LEASE_SECONDS = 300
+
+# An account whose lease has expired this many times is marked failed
+# rather than handed out again, so one account that keeps killing
+# browsers cannot stall the run.
+MAX_LEASES = 5
+
+
+class LeaseQueue:
+
+    def __init__(self, path, lease_seconds=DEFAULT_LEASE_SECONDS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        # One connection shared by the pipeline threads and the lease heartbeat.
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=DELETE")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS accounts ("
+            " idx INTEGER NOT NULL,"
+            " account TEXT PRIMARY KEY,"
+            " manual TEXT NOT NULL,"
+            " state TEXT NOT NULL DEFAULT 'pending',"
+            " worker TEXT,"
+            " lease_until REAL,"
+            " leases INTEGER NOT NULL DEFAULT 0,"
+            " status TEXT,"
+            " record TEXT,"
+            " updated_at REAL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS accounts_state ON accounts (state, idx)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    def _transaction(self, work):
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                result = work()
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+            self.db.execute("COMMIT")
+            return result
+
+    def set_meta(self, key, value):
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, json.dumps(value)))
+
+    def meta(self, key, default=None):
+        with self.lock:
+            row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def enqueue(self, accounts):
+        """Add (acct, manual) pairs in input order; accounts already queued keep their state.
+
+        Accounts that failed in an earlier attempt go back to pending, so
+        rerunning the coordinator retries them. Returns the number added.
+        """
+        def work():
+            now = time.time()
+            before = self.db.execute("SELECT COUNT(*) FROM accounts").fetchone()[0]
+            self.db.executemany(
+                "INSERT OR IGNORE INTO accounts (idx, account, manual, updated_at) VALUES (?, ?, ?, ?)",
+                ((index, acct, json.dumps(manual, default=str), now) for index, (acct, manual) in enumerate(accounts)),
+            )
+            self.db.execute("UPDATE accounts SET state = 'pending', worker = NULL, leases = 0, updated_at = ? "
+                            "WHERE state = 'failed'", (now,))
+            return self.db.execute("SELECT COUNT(*) FROM accounts").fetchone()[0] - before
+        return self._transaction(work)
+
+    def lease(self, worker, count=1):
+        """Lease up to `count` pending accounts to `worker`; returns [(index, acct, manual)].
+
+        Expired leases are reclaimed first.
+        """
+        def work():
+            now = time.time()
+            self.db.execute(
+                "UPDATE accounts SET state = 'failed', status = 'Error', worker = NULL, updated_at = ?,"
+                " record = json_object('ACCOUNT NO', account, 'Status', 'Error', 'Reason', 'lease expired repeatedly')"
+                " WHERE state = 'leased' AND lease_until < ? AND leases >= ?",
+                (now, now, MAX_LEASES),
+            )
+            self.db.execute(
+                "UPDATE accounts SET state = 'pending', worker = NULL, updated_at = ? "
+                "WHERE state = 'leased' AND lease_until < ?",
+                (now, now),
+            )
+            rows = self.db.execute(
+                "SELECT idx, account, manual FROM accounts WHERE state = 'pending' ORDER BY idx LIMIT ?", (count,)
+            ).fetchall()
+            self.db.executemany(
+                "UPDATE accounts SET state = 'leased', worker = ?, lease_until = ?, leases = leases + 1, updated_at = ? "
+                "WHERE account = ?",
+                ((worker, now + self.lease_seconds, now, acct) for _, acct, _ in rows),
+            )
+            return [(index, acct, json.loads(manual)) for index, acct, manual in rows]
+        return self._transaction(work)
+
+    def renew(self, worker):
+        """Push back the expiry of every lease `worker` still holds."""
+        now = time.time()
+        self._transaction(lambda: self.db.execute(
+            "UPDATE accounts SET lease_until = ? WHERE state = 'leased' AND worker = ?",
+            (now + self.lease_seconds, worker),
+        ))
+
+    def complete(self, worker, acct, record):
+        """Store the final record of `acct`; errors are kept as failed so the coordinator can report them."""
+        state = "failed" if record.get("Status") == "Error" else "done"
+        self._transaction(lambda: self.db.execute(
+            "UPDATE accounts SET state = ?, status = ?, record = ?, worker = ?, lease_until = NULL, updated_at = ? "
+            "WHERE account = ? AND state != 'done'",
+            (state, record.get("Status"), json.dumps(record, ensure_ascii=False, default=str), worker, time.time(), acct),
+        ))
+
+    def counts(self):
+        """{state: accounts} for pending, leased, done and failed."""
+        counts = {"pending": 0, "leased": 0, "done": 0, "failed": 0}
+        with self.lock:
+            counts.update(self.db.execute("SELECT state, COUNT(*) FROM accounts GROUP BY state").fetchall())
+        return counts
+
+    def finished(self):
+        counts = self.counts()
+        return counts["pending"] == 0 and counts["leased"] == 0
+
+    def stream(self, worker, batch=1, poll=5.0, stop=None):
+        """Yield (acct, manual) leased to `worker` until the queue is finished or `stop` is set.
+
+        While other workers still hold leases it keeps polling, since an
+        expired lease comes back as pending. `stop` (a threading.Event)
+        ends it early; whatever it leased by then stays leased until
+        `release`.
+        """
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            leased = self.lease(worker, batch)
+            if leased:
+                for _, acct, manual in leased:
+                    yield acct, manual
+                continue
+            if self.finished():
+                return
+            stop.wait(poll)
+
+    def release(self, worker):
+        """Put every account `worker` still holds back to pending, for a worker giving up; returns how many."""
+        now = time.time()
+        return self._transaction(lambda: self.db.execute(
+            "UPDATE accounts SET state = 'pending', worker = NULL, lease_until = NULL, updated_at = ? "
+            "WHERE state = 'leased' AND worker = ?",
+            (now, worker),
+        ).rowcount)
+
+    def records(self):
+        """Every finished record, in input order. Meant for the coordinator, which has no other threads."""
+        for (record,) in self.db.execute("SELECT record FROM accounts WHERE record IS NOT NULL ORDER BY idx"):
+            yield json.loads(record)
+
+    def close(self):
+        with self.lock:
+            self.db.close()
@@ -0,0 +1,274 @@
+"""Output sinks for finished records.
+
+A sink is any object with ``write(record)``, called once per account in
+input order (failed records included; each sink decides what to keep),
+and ``close()``, which returns the output's path or None when it could
+not be saved. A run can feed several sinks at once.
+
+``TemplateWriter`` reads the template's header row, column widths and
+header styles once, then appends each record to a write-only workbook as
+it arrives, so memory stays flat however many rows the run produces.
+When the template cannot be used it falls back to a plain workbook with
+a fixed header, through the same code path.
+
+``CsvWriter`` and ``ParquetWriter`` write every record with its status
+and scrape time, for systems that don't want to parse xlsx.
+``SqliteSink`` keeps one row per account in a database that outlives the
+run, upserted by ``ACCOUNT NO``, so the latest data for any account is
+one indexed lookup away.
+"""
+import copy
+import csv
+import json
+import sqlite3
+
+# Columns written as text so Excel keeps the MM/DD/YYYY strings as typed.
+TEXT_COLUMNS = ["ENDO DATE", "NEW_PULLOUT_DATE"]
+
+# Added by the CSV, Parquet and SQLite sinks after the record columns.
+STATUS_COLUMNS = ["Status", "Reason", "scraped_at"]
+
+DEFAULT_SQLITE_PATH = "cams_results.sqlite3"
+
+
+def _row(record, columns):
+    row = {column: "" if record.get(column) is None else str(record.get(column)) for column in columns}
+    row["Status"] = record.get("Status", "")
+    row["Reason"] = record.get("Reason", "")
+    # Stamped once by the pipeline, so a resumed or coordinated run keeps the original time.
+    row["scraped_at"] = record.get("scraped_at", "")
+    return row
+
+
+class TemplateWriter:
+
+    def __init__(self, template_path, output_path, fallback_path=None, fallback_columns=None):
+        # openpyxl takes longer to import than the rest of the script; runs
+        # without an xlsx output never load it.
+        import openpyxl
+        from openpyxl.cell import WriteOnlyCell
+
+        self.openpyxl = openpyxl
+        self.cell = WriteOnlyCell
+        self.rows = 0
+        try:
+            self._open_template(template_path)
+            self.path = output_path
+        except Exception as e:
+            if fallback_path is None:
+                raise
+            print(f"Could not use template {template_path}: {e}")
+            self._open_plain(fallback_columns or [])
+            self.path = fallback_path
+            print(f"Writing fallback workbook instead: {fallback_path}")
+
+    def _open_template(self, template_path):
+        template = self.openpyxl.load_workbook(template_path)
+        source = template.active
+
+        self.headers = {}
+        for cell in source[1]:
+            if cell.value:
+                self.headers[str(cell.value).strip().upper()] = cell.column
+        print(f"Template headers found: {list(self.headers.keys())}")
+
+        self.wb = self.openpyxl.Workbook(write_only=True)
+        self.ws = self.wb.create_sheet(source.title)
+        self.ws.sheet_view.zoomScale = source.sheet_view.zoomScale
+        for letter, dimension in source.column_dimensions.items():
+            self.ws.column_dimensions[letter].width = dimension.width
+        if source.row_dimensions[1].height:
+            self.ws.row_dimensions[1].height = source.row_dimensions[1].height
+
+        header_row = []
+        for cell in source[1]:
+            out = self.cell(self.ws, value=cell.value)
+            if cell.has_style:
+                out.font = copy.copy(cell.font)
+                out.fill = copy.copy(cell.fill)
+                out.border = copy.copy(cell.border)
+                out.alignment = copy.copy(cell.alignment)
+                out.protection = copy.copy(cell.protection)
+                out.number_format = cell.number_format
+            header_row.append(out)
+        self.ws.append(header_row)
+        template.close()
+
+    def _open_plain(self, columns):
+        from openpyxl.styles import Font
+
+        self.headers = {column.upper(): index for index, column in enumerate(columns, 1)}
+        self.wb = self.openpyxl.Workbook(write_only=True)
+        self.ws = self.wb.create_sheet("Sheet1")
+        header_row = []
+        for column in columns:
+            cell = self.cell(self.ws, value=column)
+            cell.font = Font(bold=True)
+            header_row.append(cell)
+        self.ws.append(header_row)
+
+    def write(self, record):
+        if record.get("Status") != "Success":
+            return
+        row = [None] * max(self.headers.values(), default=0)
+        for key, value in record.items():
+            if key == "Status":
+                continue
+            key_upper = str(key).strip().upper()
+            column = self.headers.get(key_upper)
+            if column is None:
+                continue
+            cell = self.cell(self.ws, value=str(value) if value is not None else "")
+            if key_upper in TEXT_COLUMNS:
+                cell.number_format = '@'
+            row[column - 1] = cell
+        self.ws.append(row)
+        self.rows += 1
+
+    def close(self):
+        """Save the workbook; returns its path, or None when saving failed."""
+        try:
+            self.wb.save(self.path)
+        except Exception as e:
+            print(f"Error saving results to {self.path}: {e}")
+            return None
+        print(f"Results saved to: {self.path}")
+        return self.path
+
+
+class CsvWriter:
+    """Every record as one CSV row, flushed as it arrives."""
+
+    def __init__(self, path, columns):
+        self.path = path
+        self.columns = list(columns)
+        self.rows = 0
+        self.file = open(path, "w", encoding="utf-8-sig", newline="")
+        self.writer = csv.DictWriter(self.file, fieldnames=self.columns + STATUS_COLUMNS)
+        self.writer.writeheader()
+
+    def write(self, record):
+        self.writer.writerow(_row(record, self.columns))
+        self.file.flush()
+        self.rows += 1
+
+    def close(self):
+        try:
+            self.file.close()
+        except OSError as e:
+            print(f"Error saving results to {self.path}: {e}")
+            return None
+        print(f"CSV results saved to: {self.path}")
+        return self.path
+
+
+class ParquetWriter:
+    """Every record in a Parquet file of string columns, one row group per `batch_size` records. Needs pyarrow."""
+
+    def __init__(self, path, columns, batch_size=1000):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ValueError("Parquet output needs pyarrow (pip install pyarrow)") from None
+        self.path = path
+        self.columns = list(columns)
+        self.batch_size = batch_size
+        self.rows = 0
+        self.batch = []
+        self.pa = pyarrow
+        self.schema = pyarrow.schema([(column, pyarrow.string()) for column in self.columns + STATUS_COLUMNS])
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema, compression="zstd")
+
+    def _flush(self):
+        if self.batch:
+            table = self.pa.Table.from_pylist(self.batch, schema=self.schema)
+            self.writer.write_table(table)
+            self.batch = []
+
+    def write(self, record):
+        self.batch.append(_row(record, self.columns))
+        self.rows += 1
+        if len(self.batch) >= self.batch_size:
+            self._flush()
+
+    def close(self):
+        try:
+            self._flush()
+            self.writer.close()
+        except Exception as e:
+            print(f"Error saving results to {self.path}: {e}")
+            return None
+        print(f"Parquet results saved to: {self.path}")
+        return self.path
+
+
+class SqliteSink:
+    """Latest record per account in a SQLite table that carries over between runs.
+
+    Successes replace the account's row and its ``scraped_at``;
+    ``first_scraped_at`` keeps the first time it was seen. A not-found
+    result only updates ``Status``, ``Reason`` and ``scraped_at``, keeping
+    the last good data, and errors are skipped, so neither a transient
+    search miss nor a failed retry wipes what the table already holds.
+    """
+
+    def __init__(self, path, columns, commit_every=100):
+        self.path = path
+        self.columns = list(columns)
+        self.commit_every = commit_every
+        self.rows = 0
+        self.pending = 0
+        # Opened by the CLI thread, written by the pipeline's sink thread.
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        stored = self.columns + ["Status", "Reason", "scraped_at", "first_scraped_at", "record"]
+        definitions = ", ".join(
+            f"{self._quote(column)} TEXT" + (" PRIMARY KEY" if column == "ACCOUNT NO" else "") for column in stored
+        )
+        self.db.execute(f"CREATE TABLE IF NOT EXISTS records ({definitions})")
+        known = {row[1] for row in self.db.execute("PRAGMA table_info(records)")}
+        for column in stored:
+            if column not in known:
+                self.db.execute(f"ALTER TABLE records ADD COLUMN {self._quote(column)} TEXT")
+        self.db.execute("CREATE INDEX IF NOT EXISTS records_scraped_at ON records (scraped_at)")
+        self.db.commit()
+
+        self.upsert = self._upsert(stored, [column for column in stored
+                                            if column not in ("ACCOUNT NO", "first_scraped_at")])
+        self.upsert_status = self._upsert(stored, ["Status", "Reason", "scraped_at"])
+
+    def _upsert(self, stored, updated):
+        return (
+            f"INSERT INTO records ({', '.join(self._quote(column) for column in stored)}) "
+            f"VALUES ({', '.join('?' for _ in stored)}) "
+            f"ON CONFLICT ({self._quote('ACCOUNT NO')}) DO UPDATE SET "
+            + ", ".join(f"{self._quote(column)} = excluded.{self._quote(column)}" for column in updated)
+        )
+
+    @staticmethod
+    def _quote(column):
+        return '"' + column.replace('"', '""') + '"'
+
+    def write(self, record):
+        if record.get("Status") == "Error":
+            return
+        row = _row(record, self.columns)
+        values = [row[column] for column in self.columns] + [
+            row["Status"], row["Reason"], row["scraped_at"], row["scraped_at"], json.dumps(record, ensure_ascii=False, default=str),
+        ]
+        self.db.execute(self.upsert if record.get("Status") == "Success" else self.upsert_status, values)
+        self.rows += 1
+        self.pending += 1
+        if self.pending >= self.commit_every:
+            self.db.commit()
+            self.pending = 0
+
+    def close(self):
+        try:
+            self.db.commit()
+            self.db.close()
+        except sqlite3.Error as e:
+            print(f"Error saving results to {self.path}: {e}")
+            return None
+        print(f"Upserted {self.rows} accounts into: {self.path}")
+        return self.path
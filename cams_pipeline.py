@@ -0,0 +1,198 @@
+"""A scraping run as stages joined by bounded queues.
+
+    account source -> scraper session(s) -> normalizer -> sink(s)
+
+The source is read ahead on its own thread, the scrapers only drive their
+browsers (or HTTP sessions), and record clean-up, the ``on_result`` hook
+(the CLI's journal) and the sinks (workbook, CSV, database...) run on a second
+thread, so a slow fsync or workbook write never delays the next browser
+action. Every queue is bounded, so a slow stage holds the ones before it
+back instead of letting records pile up in memory.
+
+The CLI builds one ``Pipeline`` per run; a scheduler can do the same::
+
+    from cams import BrowserSession
+    from cams_input import AccountSource
+    from cams_output import TemplateWriter
+    from cams_pipeline import Pipeline
+
+    writer = TemplateWriter("(TEMPLATE).xlsx", "out.xlsx")
+    Pipeline(AccountSource("accounts.csv"), BrowserSession, sinks=[writer], workers=2).run()
+    writer.close()
+"""
+import collections
+import datetime
+import logging
+import queue
+import threading
+
+import cams
+from cams_retry import MAX_RETRIES
+
+log = logging.getLogger("cams.pipeline")
+
+DEFAULT_QUEUE_SIZE = 64
+
+_END = object()
+
+
+def normalize_record(record):
+    """Tidy a finished record: collapse whitespace in every text field and keep only the REM STAT number."""
+    if record.get("Status") != cams.STATUS_SUCCESS:
+        return record
+    for key, value in record.items():
+        if isinstance(value, str):
+            record[key] = " ".join(value.split())
+    rem_stat = record.get("REM STAT", "")
+    record["REM STAT"] = rem_stat.split("/")[0].strip() if rem_stat else ""
+    return record
+
+
+class Pipeline:
+    """One scraping run over `accounts`, an iterable of ``(acct, manual)`` such as an AccountSource.
+
+    `sinks` get every record in input order through their ``write``
+    method (failed records included; the sink decides what to keep) and
+    are left open for the caller to close. Each record is stamped with
+    ``scraped_at`` as it leaves the scrapers. `done` maps accounts finished
+    by an earlier run to their records; those are passed to the sinks in
+    their place without being scraped. `on_result(index, acct, record)` is
+    called for each newly scraped account in completion order, off the
+    scraper threads. A `recycler` (cams_recycle.Recycler) renews browsers
+    on schedule and kills ones that hang.
+
+    When every session has stopped, the accounts still unread are reported
+    as errors, unless `abandon` is False: then the source is left unread
+    for someone else to take over, as a lease queue worker does. `stop`
+    is the event set once scraping has ended; hand the same one to a
+    source that can wait indefinitely, such as ``LeaseQueue.stream``, so
+    it gives up then.
+    """
+
+    def __init__(self, accounts, session_factory=None, sinks=(), workers=1, done=None, on_result=None,
+                 max_retries=MAX_RETRIES, pacer=None, queue_size=DEFAULT_QUEUE_SIZE, recycler=None, abandon=True,
+                 stop=None):
+        self.accounts = accounts
+        self.session_factory = session_factory
+        self.sinks = list(sinks)
+        self.workers = workers
+        self.done = done or {}
+        self.on_result = on_result
+        self.max_retries = max_retries
+        self.pacer = pacer
+        self.recycler = recycler
+        self.abandon = abandon
+        self.source_queue = queue.Queue(queue_size)
+        self.result_queue = queue.Queue(queue_size)
+        self.sink_queue = queue.Queue(queue_size)
+        self.statuses = collections.Counter()
+        self.errors = collections.Counter()
+        self.timer = cams.StepTimer()
+        self._failures = []
+        self._stop = stop or threading.Event()
+
+    # -- stages -----------------------------------------------------------
+
+    def _read(self):
+        try:
+            for index, (acct, manual) in enumerate(self.accounts):
+                if self._stop.is_set():
+                    break
+                if acct in self.done:
+                    self.result_queue.put((index, acct, self.done[acct], False))
+                else:
+                    self.source_queue.put((index, acct, manual))
+        except Exception as e:
+            self._failures.append(e)
+        finally:
+            self.source_queue.put(_END)
+
+    def _pending(self, first):
+        yield first
+        while True:
+            item = self.source_queue.get()
+            if item is _END:
+                return
+            yield item
+
+    def _collect(self, index, acct, data):
+        self.result_queue.put((index, acct, data, True))
+
+    def _normalize(self):
+        ordered = cams.InputOrder(self.sink_queue.put)
+        while True:
+            item = self.result_queue.get()
+            if item is _END:
+                break
+            index, acct, data, fresh = item
+            try:
+                normalize_record(data)
+                # Records from `done` keep the time of the run that scraped them.
+                data.setdefault("scraped_at", datetime.datetime.now().isoformat(timespec="seconds"))
+                self.statuses[data["Status"]] += 1
+                if data["Status"] == cams.STATUS_ERROR:
+                    self.errors[data.get("Reason", "")] += 1
+                if fresh and self.on_result is not None:
+                    self.on_result(index, acct, data)
+                ordered.put(index, data)
+            except Exception as e:
+                # Keep draining so the scrapers never block on a full queue.
+                log.error(f"Could not hand on the record for {acct}: {e}")
+                self._failures.append(e)
+        ordered.flush()
+        self.sink_queue.put(_END)
+
+    def _write(self):
+        while True:
+            record = self.sink_queue.get()
+            if record is _END:
+                return
+            for sink in self.sinks:
+                try:
+                    sink.write(record)
+                except Exception as e:
+                    log.error(f"Could not write {record.get('ACCOUNT NO')} to {type(sink).__name__}: {e}")
+                    self._failures.append(e)
+
+    # -- run --------------------------------------------------------------
+
+    def run(self):
+        """Scrape every pending account and wait for the sinks to catch up; returns the StepTimer.
+
+        Raises the first error a source, normalizer or sink stage hit, after
+        the run has finished.
+        """
+        stages = [
+            threading.Thread(target=self._read, name="pipeline-source", daemon=True),
+            threading.Thread(target=self._normalize, name="pipeline-normalizer"),
+            threading.Thread(target=self._write, name="pipeline-sink"),
+        ]
+        for stage in stages:
+            stage.start()
+
+        try:
+            # Don't start any browser until there is something to scrape.
+            first = self.source_queue.get()
+            if first is not _END:
+                accounts = self._pending(first)
+                if self.workers > 1:
+                    self.timer = cams.run_worker_pool(accounts, self.workers, self.session_factory, self._collect,
+                                                      self.max_retries, self.pacer, self.recycler, self.abandon)
+                else:
+                    self.timer = cams.run_sequential(accounts, self.session_factory, self._collect,
+                                                     self.max_retries, self.pacer, self.recycler, self.abandon)
+        finally:
+            # If scraping stopped early, unblock the reader and let it quit.
+            self._stop.set()
+            while stages[0].is_alive():
+                try:
+                    self.source_queue.get(timeout=.1)
+                except queue.Empty:
+                    pass
+            self.result_queue.put(_END)
+            for stage in stages[1:]:
+                stage.join()
+
+        if self._failures:
+            raise self._failures[0]
+        return self.timer
@@ -0,0 +1,150 @@
+"""Browser recycling and the hung-page watchdog for long runs.
+
+Chrome grows over a few thousand page loads, and now and then a page or
+chromedriver stops answering altogether. ``Recycler`` keeps a long run
+steady on both counts:
+
+- after every ``every`` accounts, or once the browser's resident memory
+  passes ``max_rss_mb``, the session is quit and started again. Its saved
+  login cookies (see cams_cookies) make the restart skip the login form,
+  and ``start()`` parks the new browser in SystemFrame as usual.
+- a watchdog thread kills the browser of any session that has spent more
+  than ``hang_timeout`` seconds on one account. The stuck WebDriver call
+  then fails, the session reports itself dead, and the account goes back
+  into the queue for a fresh session.
+
+Memory is read with psutil when it is installed; without it only the
+account count triggers a recycle.
+"""
+import contextlib
+import logging
+import threading
+import time
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+log = logging.getLogger("cams.recycle")
+
+DEFAULT_RECYCLE_EVERY = 250
+DEFAULT_MAX_RSS_MB = 1500
+DEFAULT_HANG_TIMEOUT = 180
+
+
+def _process_tree(driver):
+    """chromedriver and every Chrome process under it; [] without psutil or a running service."""
+    if psutil is None:
+        return []
+    try:
+        root = psutil.Process(driver.service.process.pid)
+        return [root] + root.children(recursive=True)
+    except (psutil.Error, AttributeError):
+        return []
+
+
+def browser_rss_mb(driver):
+    """Resident memory of chromedriver and every Chrome process under it, or None without psutil."""
+    processes = _process_tree(driver)
+    if not processes:
+        return None
+    total = 0
+    for process in processes:
+        try:
+            total += process.memory_info().rss
+        except psutil.Error:
+            pass
+    return total / (1024 * 1024)
+
+
+def kill_browser(driver):
+    """Kill chromedriver and its Chrome processes outright, without going through WebDriver."""
+    for process in reversed(_process_tree(driver)):
+        try:
+            process.kill()
+        except psutil.Error:
+            pass
+    # Without psutil only chromedriver itself can be reached; Chrome exits once it loses its driver.
+    process = getattr(getattr(driver, "service", None), "process", None)
+    if process is not None:
+        try:
+            process.kill()
+        except OSError:
+            pass
+
+
+class Recycler:
+    """Decides when a session is due for a fresh browser, and kills sessions stuck on one account.
+
+    Shared by every session of a run. `every`, `max_rss_mb` and
+    `hang_timeout` can each be None to switch that check off.
+    """
+
+    def __init__(self, every=DEFAULT_RECYCLE_EVERY, max_rss_mb=DEFAULT_MAX_RSS_MB, hang_timeout=DEFAULT_HANG_TIMEOUT,
+                 interval=1.0):
+        self.every = every
+        self.max_rss_mb = max_rss_mb
+        self.hang_timeout = hang_timeout
+        self.interval = interval
+        self.recycled = 0
+        self.killed = 0
+        self.busy = {}
+        self.lock = threading.Lock()
+        self._thread = None
+        if max_rss_mb and psutil is None:
+            log.warning("psutil is not installed; browsers are only recycled by account count")
+
+    def due(self, session, handled):
+        """Why `session` should be recycled after `handled` accounts, or None."""
+        if self.every and handled >= self.every:
+            return f"after {handled} accounts"
+        if self.max_rss_mb:
+            rss = session.rss_mb() if hasattr(session, "rss_mb") else None
+            if rss is not None and rss > self.max_rss_mb:
+                return f"at {rss:.0f} MB resident"
+        return None
+
+    def recycle(self, session, reason):
+        """Replace the browser of `session`; raises when the new one cannot start."""
+        log.info(f"[{session.label}] Recycling the browser {reason}...")
+        session.quit()
+        self.recycled += 1
+        session.start()
+
+    @contextlib.contextmanager
+    def watch(self, session):
+        """Let the watchdog kill `session` if the block runs longer than `hang_timeout`."""
+        if not self.hang_timeout:
+            yield
+            return
+        with self.lock:
+            self.busy[session] = time.monotonic()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="browser-watchdog", daemon=True)
+                self._thread.start()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.busy.pop(session, None)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            now = time.monotonic()
+            with self.lock:
+                hung = [session for session, since in self.busy.items() if now - since > self.hang_timeout]
+                for session in hung:
+                    del self.busy[session]
+            for session in hung:
+                log.warning(f"[{session.label}] No progress for {self.hang_timeout:.0f}s, killing the browser")
+                self.killed += 1
+                try:
+                    session.kill()
+                except Exception as e:
+                    log.error(f"[{session.label}] Could not kill the browser: {e}")
+
+    def report(self):
+        if self.recycled or self.killed:
+            print(f"Browsers: {self.recycled} recycled, {self.killed} killed by the watchdog")
@@ -0,0 +1,197 @@
+"""Retry scheduling and adaptive pacing for the account loop.
+
+``WorkQueue`` hands accounts to the sessions and takes failed ones back
+with an exponential backoff, so a flaky account is tried again later in
+the same run instead of being dropped. ``Pacer`` spaces accounts out when
+CAMS starts answering slowly or failing, and closes the gap again once it
+recovers, so the run backs off a struggling server on its own.
+"""
+import heapq
+import itertools
+import random
+import threading
+import time
+
+MAX_RETRIES = 3
+
+# Retry n waits about BACKOFF_BASE * 2 ** (n - 1) seconds, capped at BACKOFF_MAX.
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = 60.0
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """Seconds before retry number `attempt` (1-based), jittered so workers don't retry in lockstep."""
+    return random.uniform(.5, 1) * min(cap, base * 2 ** (attempt - 1))
+
+
+class WorkQueue:
+    """Accounts still to process: fresh ones pulled lazily from `items`, plus retries waiting out their backoff.
+
+    `items` yields ``(index, acct, manual)`` in input order and is read
+    one account ahead of the sessions by a feeder thread, so a long input
+    streams through and a source that blocks (such as a shared lease
+    queue waiting on this worker's own retry) never holds up a retry that
+    has come due. Due retries are served before fresh accounts to keep
+    the out-of-order window small. `get()` blocks while only backoffs or
+    other sessions' accounts are pending, and returns None once
+    everything is finished.
+    """
+
+    def __init__(self, items, max_retries=MAX_RETRIES):
+        self.items = iter(items)
+        self.max_retries = max_retries
+        self.total = 0
+        self.exhausted = False
+        self.in_flight = 0
+        self.retries = []
+        self.attempts = {}
+        self.cond = threading.Condition()
+        self._order = itertools.count()
+        self._fresh = None
+        self._error = None
+        self._feeder = None
+
+    def _feed(self):
+        # Runs without the lock while it waits on `items`; hands over one account at a time.
+        try:
+            for item in self.items:
+                with self.cond:
+                    self.total += 1
+                    self._fresh = item
+                    self.cond.notify_all()
+                    while self._fresh is not None:
+                        self.cond.wait()
+        except Exception as e:
+            with self.cond:
+                self._error = e
+        with self.cond:
+            self.exhausted = True
+            self.cond.notify_all()
+
+    def _start_feeder(self):
+        if self._feeder is None:
+            self._feeder = threading.Thread(target=self._feed, name="work-feeder", daemon=True)
+            self._feeder.start()
+
+    def _take_fresh(self):
+        item, self._fresh = self._fresh, None
+        self.cond.notify_all()
+        return item
+
+    def get(self):
+        """Next (index, acct, manual) to process, or None when the run is finished."""
+        with self.cond:
+            self._start_feeder()
+            while True:
+                if self._error is not None:
+                    raise self._error
+                now = time.monotonic()
+                if self.retries and self.retries[0][0] <= now:
+                    item = heapq.heappop(self.retries)[2]
+                elif self._fresh is not None:
+                    item = self._take_fresh()
+                else:
+                    item = None
+                if item is not None:
+                    self.in_flight += 1
+                    return item
+                if self.exhausted and not self.retries and not self.in_flight:
+                    return None
+                # Wake for the next fresh account, or when the earliest retry comes due.
+                self.cond.wait(self.retries[0][0] - now if self.retries else None)
+
+    def finished(self):
+        """True once the input has been read to the end and no account is waiting or handed out."""
+        with self.cond:
+            return self.exhausted and self._fresh is None and not self.retries and not self.in_flight
+
+    def progress(self, index):
+        """"index/total" once the input has been read to the end, else just the position."""
+        return f"{index + 1}/{self.total}" if self.exhausted else f"{index + 1}"
+
+    def retries_used(self, acct):
+        with self.cond:
+            return self.attempts.get(acct, 0)
+
+    def retry(self, item, delay=None):
+        """Queue `item` again after its backoff (or `delay` seconds).
+
+        Returns the delay used, or None when the account has run out of
+        retries; the caller then reports it and calls `done()`.
+        """
+        acct = item[1]
+        with self.cond:
+            attempt = self.attempts.get(acct, 0) + 1
+            if attempt > self.max_retries:
+                return None
+            self.attempts[acct] = attempt
+            if delay is None:
+                delay = backoff_delay(attempt)
+            heapq.heappush(self.retries, (time.monotonic() + delay, next(self._order), item))
+            self.in_flight -= 1
+            self.cond.notify_all()
+            return delay
+
+    def done(self):
+        """Mark one handed-out account as finished, successfully or not."""
+        with self.cond:
+            self.in_flight -= 1
+            self.cond.notify_all()
+
+    def abandon(self):
+        """Take every account nobody will process any more, e.g. after all sessions died."""
+        with self.cond:
+            self._start_feeder()
+            left = [entry[2] for entry in self.retries]
+            self.retries.clear()
+            while not self.exhausted:
+                if self._fresh is not None:
+                    left.append(self._take_fresh())
+                else:
+                    self.cond.wait()
+            self.cond.notify_all()
+            return sorted(left, key=lambda item: item[0])
+
+
+class Pacer:
+    """Adds a delay before each account that grows while CAMS is struggling.
+
+    Per-account time feeds a fast and a slow moving average. When the
+    fast one runs `slow_factor` times above the slow one, or an account
+    fails with an error, the delay doubles (starting at `min_delay`, up to
+    `max_delay`); every healthy account halves it until it drops to zero.
+    One pacer is shared by all workers, so the whole run slows together.
+    """
+
+    def __init__(self, min_delay=.5, max_delay=10.0, slow_factor=1.5):
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.slow_factor = slow_factor
+        self.delay = 0.0
+        self.peak_delay = 0.0
+        self.fast = None
+        self.slow = None
+        self.lock = threading.Lock()
+
+    def record(self, seconds, healthy=True):
+        with self.lock:
+            if self.fast is None:
+                self.fast = self.slow = seconds
+            self.fast += .3 * (seconds - self.fast)
+            self.slow += .02 * (seconds - self.slow)
+            if not healthy or self.fast > self.slow * self.slow_factor:
+                self.delay = min(self.max_delay, max(self.min_delay, self.delay * 2))
+                self.peak_delay = max(self.peak_delay, self.delay)
+            elif self.delay:
+                self.delay = self.delay / 2 if self.delay / 2 >= self.min_delay else 0.0
+
+    def wait(self):
+        with self.lock:
+            delay = self.delay
+        if delay:
+            time.sleep(delay)
+
+    def report(self):
+        if self.peak_delay:
+            print(f"Pacing: slowed down to {self.peak_delay:.1f}s between accounts at most, "
+                  f"{self.delay:.1f}s at the end")
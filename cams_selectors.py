@@ -0,0 +1,120 @@
+"""Learned ordering for the fallback locator cascades.
+
+Each cascade (search result, popup OK button, Account Details dropdown,
+Collateral link, vehicle DetailLink) is a list of ``(By, selector)``
+candidates. Instead of giving every candidate its own full wait, one
+``WebDriverWait`` polls all of them per tick, in order of how often each
+has won before, so a miss on a stale favourite costs one
+``find_elements`` call rather than a timeout. Optional cascades such as
+the popup shrink their wait by how rarely they have been found at all.
+Win counts are saved to a JSON file and picked up by the next run.
+"""
+import json
+import os
+import threading
+
+from selenium.common.exceptions import (
+    InvalidSelectorException,
+    StaleElementReferenceException,
+    TimeoutException,
+)
+
+DEFAULT_STATS_PATH = "cams_selectors.json"
+
+
+def _key(by, template):
+    return f"{by}={template}"
+
+
+class SelectorRegistry:
+
+    def __init__(self, path=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.stats = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.stats = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable selector stats {path}: {e}")
+
+    def _cascade(self, cascade):
+        return self.stats.setdefault(cascade, {"looked": 0, "found": 0, "hits": {}})
+
+    def ordered(self, cascade, candidates):
+        """Candidates sorted by past wins; ties keep the declared order."""
+        with self.lock:
+            hits = dict(self._cascade(cascade)["hits"])
+        return sorted(candidates, key=lambda candidate: -hits.get(_key(*candidate), 0))
+
+    def found_rate(self, cascade):
+        with self.lock:
+            stats = self._cascade(cascade)
+            return (stats["found"] + 1) / (stats["looked"] + 1)
+
+    def find(self, driver, cascade, candidates, timeout, optional=False, **fmt):
+        """Return (element, selector) for the first clickable candidate, or (None, None).
+
+        `fmt` fills placeholders in the selector templates (e.g. ``{acct}``).
+        For `optional` cascades the timeout is scaled by how often the
+        element has turned up at all, so a rarely seen popup costs close to
+        a single poll.
+        """
+        # Deferred like cams.import_selenium(): it drags in the whole remote WebDriver stack.
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        order = self.ordered(cascade, candidates)
+        located = [(by, template.format(**fmt) if fmt else template) for by, template in order]
+        if optional:
+            timeout *= self.found_rate(cascade)
+
+        def probe(d):
+            for candidate, (by, selector) in zip(order, located):
+                try:
+                    for element in d.find_elements(by, selector):
+                        if element.is_displayed() and element.is_enabled():
+                            return candidate, selector, element
+                except (StaleElementReferenceException, InvalidSelectorException):
+                    continue
+            return False
+
+        try:
+            poll = max(min(.1, timeout), .01)
+            candidate, selector, element = WebDriverWait(driver, timeout, poll_frequency=poll).until(probe)
+        except TimeoutException:
+            self._record(cascade, None)
+            return None, None
+
+        self._record(cascade, candidate)
+        return element, selector
+
+    def _record(self, cascade, candidate):
+        with self.lock:
+            stats = self._cascade(cascade)
+            stats["looked"] += 1
+            if candidate is not None:
+                stats["found"] += 1
+                key = _key(*candidate)
+                stats["hits"][key] = stats["hits"].get(key, 0) + 1
+
+    def save(self):
+        if not self.path:
+            return
+        with self.lock:
+            payload = json.dumps(self.stats, indent=2, sort_keys=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(payload)
+        os.replace(tmp_path, self.path)
+
+    def report(self):
+        with self.lock:
+            if not self.stats:
+                return
+            print("Selector hit rates:")
+            for cascade, stats in self.stats.items():
+                looked = stats["looked"] or 1
+                print(f"  {cascade}: found {stats['found']}/{stats['looked']}")
+                for key, hits in sorted(stats["hits"].items(), key=lambda item: -item[1]):
+                    print(f"    {hits / looked:6.1%}  {key}")
@@ -0,0 +1,228 @@
+"""Levelled logging, JSON-lines run events and live metrics.
+
+Everything the scraper reports while it runs goes through the ``cams``
+loggers: step-by-step detail at DEBUG, one line per finished account at
+INFO, retries and dead sessions at WARNING. ``configure`` decides where
+that goes:
+
+- the console, at ``--log-level`` (INFO by default, so a healthy run
+  prints one line per account instead of a dozen);
+- optionally a JSON-lines file (``--events``) at its own level, one
+  object per record with the structured fields of events such as the
+  per-account trace (steps with their durations, the selectors that
+  matched, status and reason);
+- ``RunMetrics``, which folds the account and session start events into
+  throughput, step latency percentiles (login included) and failure
+  categories for the run summary, and can serve them in the Prometheus
+  text format on a local port while the run is going.
+
+Events are plain log records on the ``cams.events`` logger, sent with
+``emit``, so they cost one level check when nobody listens.
+"""
+import collections
+import datetime
+import http.server
+import json
+import logging
+import sys
+import threading
+import time
+
+LOG_LEVELS = ["debug", "info", "warning", "error"]
+
+log = logging.getLogger("cams")
+events = logging.getLogger("cams.events")
+
+
+def emit(event, message=None, level=logging.INFO, **fields):
+    """Log a structured `event`; `message` is the human-readable line for the console."""
+    if events.isEnabledFor(level):
+        events.log(level, message or event, extra={"event": event, "fields": fields})
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _percentile(values, pct):
+    # Same nearest-rank rule as cams.percentile, without importing cams.
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))] if ordered else 0.0
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, thread, message, plus the event and its fields."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        event = getattr(record, "event", None)
+        if event is not None:
+            entry["event"] = event
+            entry.update(record.fields)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RunMetrics(logging.Handler):
+    """Aggregates "account" and "session_start" events into run totals; thread-safe through the handler lock.
+
+    Step latencies count every attempt, and every session start for the
+    browser, login and frame steps; statuses, failure categories and
+    throughput count each account once, by its final outcome.
+    """
+
+    def __init__(self, window=60.0):
+        super().__init__(logging.INFO)
+        self.window = window
+        self.started = time.monotonic()
+        self.statuses = collections.Counter()
+        self.failures = collections.Counter()
+        self.retried = 0
+        self.sessions = 0
+        self.steps = collections.defaultdict(list)
+        self.seconds = []
+        self.recent = collections.deque()
+
+    def emit(self, record):
+        event = getattr(record, "event", None)
+        if event not in ("account", "session_start"):
+            return
+        fields = record.fields
+        for step in fields.get("steps", ()):
+            self.steps[step["step"]].append(step["seconds"])
+        if event == "session_start":
+            self.sessions += 1
+            return
+        if not fields.get("final"):
+            self.retried += 1
+            return
+        now = time.monotonic()
+        self.statuses[fields.get("status")] += 1
+        if fields.get("status") == "Error":
+            self.failures[fields.get("reason")] += 1
+        self.seconds.append(fields.get("seconds", 0.0))
+        self.recent.append(now)
+        while self.recent and self.recent[0] < now - self.window:
+            self.recent.popleft()
+
+    def summary(self):
+        """Totals so far: accounts, throughput, per-step latency percentiles and failure categories."""
+        with self.lock:
+            elapsed = time.monotonic() - self.started
+            accounts = sum(self.statuses.values())
+            return {
+                "accounts": accounts,
+                "elapsed": elapsed,
+                "per_minute": accounts / elapsed * 60 if elapsed else 0.0,
+                "last_minute": len(self.recent) * 60 / self.window,
+                "statuses": dict(self.statuses),
+                "retried_attempts": self.retried,
+                "sessions_started": self.sessions,
+                "failures": dict(self.failures.most_common()),
+                "account_seconds": {pct: _percentile(self.seconds, pct) for pct in (50, 95, 99)},
+                "steps": {
+                    step: {"count": len(durations), "p50": _percentile(durations, 50),
+                           "p95": _percentile(durations, 95), "p99": _percentile(durations, 99)}
+                    for step, durations in self.steps.items()
+                },
+            }
+
+    def prometheus(self):
+        """The summary in the Prometheus text exposition format."""
+        summary = self.summary()
+        lines = [
+            "# TYPE cams_accounts_total counter",
+            *(f'cams_accounts_total{{status="{_label(status)}"}} {count}' for status, count in summary["statuses"].items()),
+            "# TYPE cams_account_failures_total counter",
+            *(f'cams_account_failures_total{{reason="{_label(reason)}"}} {count}'
+              for reason, count in summary["failures"].items()),
+            "# TYPE cams_retried_attempts_total counter",
+            f"cams_retried_attempts_total {summary['retried_attempts']}",
+            "# TYPE cams_sessions_started_total counter",
+            f"cams_sessions_started_total {summary['sessions_started']}",
+            "# TYPE cams_accounts_per_minute gauge",
+            f"cams_accounts_per_minute {summary['last_minute']:.2f}",
+            "# TYPE cams_step_seconds summary",
+        ]
+        for step, stats in summary["steps"].items():
+            for pct in (50, 95, 99):
+                lines.append(f'cams_step_seconds{{step="{_label(step)}",quantile="{pct / 100}"}} {stats[f"p{pct}"]:.4f}')
+            lines.append(f'cams_step_seconds_count{{step="{_label(step)}"}} {stats["count"]}')
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serve ``/metrics`` on `host`:`port` from a daemon thread for as long as the process runs."""
+        metrics = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = http.server.ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics-endpoint", daemon=True).start()
+        log.info(f"Serving live metrics on http://{host}:{server.server_port}/metrics")
+        return server
+
+    def report(self):
+        """Log the run summary: a throughput line on the console, every figure in the event file."""
+        summary = self.summary()
+        if not summary["accounts"]:
+            return
+        emit("run_summary", f"Throughput: {summary['accounts']} accounts in {summary['elapsed']:.0f}s, "
+                            f"{summary['per_minute']:.1f} per minute; per account p50 "
+                            f"{summary['account_seconds'][50]:.2f}s, p95 {summary['account_seconds'][95]:.2f}s",
+             **summary)
+
+
+def configure(level="info", events_path=None, events_level="info", metrics_port=None):
+    """Route the ``cams`` loggers to the console and, optionally, a JSON-lines file; returns the RunMetrics."""
+    console_level = getattr(logging, level.upper())
+    file_level = getattr(logging, events_level.upper())
+
+    for handler in list(log.handlers):
+        log.removeHandler(handler)
+        handler.close()
+    for handler in list(events.handlers):
+        events.removeHandler(handler)
+
+    console = logging.StreamHandler(sys.stdout)
+    console.setLevel(console_level)
+    console.setFormatter(logging.Formatter("%(message)s"))
+    log.addHandler(console)
+    lowest = console_level
+
+    if events_path:
+        file_handler = logging.FileHandler(events_path, encoding="utf-8")
+        file_handler.setLevel(file_level)
+        file_handler.setFormatter(JsonFormatter())
+        log.addHandler(file_handler)
+        lowest = min(lowest, file_level)
+
+    metrics = RunMetrics()
+    events.addHandler(metrics)
+    log.setLevel(lowest)
+    # Account events feed the metrics even when the console shows only warnings.
+    events.setLevel(min(lowest, logging.INFO))
+    log.propagate = False
+
+    if metrics_port is not None:
+        metrics.serve(metrics_port)
+    return metrics
@@ -0,0 +1,463 @@
+"""A local stand-in for the CAMS WebForms site.
+
+Serves just enough of CAMS for the scrapers to run end to end without
+touching production: the ``LoginID``/``txtPassword``/``cmdLogin`` login,
+the ``cams.aspx`` frameset with ``SystemFrame``, the account search grid,
+the account page with its Account Details dropdown, ``accountcollateral.aspx``
+and the collateral detail form. Postbacks are checked for the
+``__VIEWSTATE``/``__EVENTVALIDATION`` the page handed out, like the real
+thing would. Some accounts raise the jQuery UI OK popup, and a login
+opens ``cams.aspx`` in a new window.
+
+Every page pulls in a stylesheet and a logo so asset blocking has
+something to block. Page latency (``latency`` +/- ``jitter`` seconds),
+asset latency and a ``failure_rate`` of HTTP 500s on the post-login pages
+are configurable, which is what ``cams_bench.py`` uses to model a slow or
+flaky CAMS.
+
+Run it directly to poke at it in a browser::
+
+    python fake_cams.py --port 8800 --accounts 25 --latency .3
+
+or start it from code::
+
+    with FakeCams(make_accounts(10)) as site:
+        session = HttpSession(url=site.url, username=site.username, password=site.password)
+"""
+import argparse
+import base64
+import collections
+import html
+import random
+import secrets
+import threading
+import time
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+SESSION_COOKIE = "ASP.NET_SessionId"
+
+_POSTBACK_SCRIPT = """<script type="text/javascript">
+function __doPostBack(eventTarget, eventArgument) {
+    var theForm = document.forms[0];
+    theForm.__EVENTTARGET.value = eventTarget;
+    theForm.__EVENTARGUMENT.value = eventArgument;
+    theForm.submit();
+}
+</script>"""
+
+# A 1x1 transparent PNG.
+_LOGO_PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII="
+)
+_SITE_CSS = "body { font-family: Arial, sans-serif; font-size: 12px; } table { border-collapse: collapse; }\n"
+
+_SURNAMES = ["BALANCIN", "YNGSON", "DELA CRUZ", "SANTOS", "REYES", "GARCIA", "MENDOZA", "TORRES"]
+_GIVEN = ["EMERSON R.", "EUPIELBIE S.", "MARIA L.", "JOSE P.", "ANA C.", "RAMON D."]
+_CITIES = ["LUCENA CITY QUEZON 4301", "IMUS CAVITE 4103", "QUEZON CITY NCR 1100", "PASIG CITY NCR 1600"]
+_COLORS = ["BLACKISH RED M", "SILVER METALLIC", "SUPER WHITE", "GRAY METALLIC"]
+_UNITS = ["2021 TOYOTA VIOS 1.3 XLE CVT AT", "2022 TOYOTA RUSH 1.5G A/T", "2020 MITSUBISHI MIRAGE G4 GLX MT"]
+
+
+def make_accounts(count, seed=0, popup_rate=.2, multi_unit_rate=.1):
+    """Deterministic synthetic accounts keyed by account number."""
+    rng = random.Random(seed)
+    accounts = {}
+    for n in range(count):
+        acct = f"0013880{rng.randrange(10 ** 8):08d}"
+        units = []
+        for _ in range(2 if rng.random() < multi_unit_rate else 1):
+            units.append({
+                "COLOR": rng.choice(_COLORS),
+                "PLATE #": f"{rng.choice('NPSTU')}{rng.randrange(10)}{rng.choice('ABJKU')}{rng.randrange(1000):03d}",
+                "SERIAL #": f"PA1B18F36L{rng.randrange(10 ** 7):07d}",
+                "ENGINE #": f"{rng.randrange(1, 3)}NR{rng.choice('XG')}{rng.randrange(10 ** 6):06d}",
+                "UNIT DESCRIPTION": rng.choice(_UNITS),
+            })
+        accounts[acct] = {
+            "ACCOUNT NAME": f"{rng.choice(_SURNAMES)}, {rng.choice(_GIVEN)}",
+            "PRIMARY ADDRESS": f"BLK{rng.randrange(1, 30)}, LOT{rng.randrange(1, 40)}, {rng.choice(_CITIES)}",
+            "SECONDARY ADDRESS": f"{rng.randrange(1, 999)} MAIN ST, {rng.choice(_CITIES)}",
+            "OB": f"{rng.randrange(50_000, 900_000):,}.{rng.randrange(100):02d}",
+            "REM STAT": f"{rng.choice([39, 41, 52])} / FOR ENDORSEMENT",
+            "DPD": str(rng.randrange(30, 720)),
+            "MOBILE #": f"09{rng.randrange(10 ** 9):09d}",
+            "units": units,
+            "popup": rng.random() < popup_rate,
+        }
+    return accounts
+
+
+def _state(page, sid):
+    return base64.b64encode(f"{page}:{sid}".encode()).decode()
+
+
+def _page(title, body, page=None, sid=None, action=None):
+    form_open = form_close = ""
+    if page:
+        form_open = (
+            f'<form name="Form1" method="post" action="{action or page}" id="Form1">\n'
+            '<input type="hidden" name="__EVENTTARGET" id="__EVENTTARGET" value="" />\n'
+            '<input type="hidden" name="__EVENTARGUMENT" id="__EVENTARGUMENT" value="" />\n'
+            f'<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="{_state(page, sid)}" />\n'
+            f'<input type="hidden" name="__EVENTVALIDATION" id="__EVENTVALIDATION" value="{_state("ev/" + page, sid)}" />\n'
+        )
+        form_close = "</form>"
+    return (
+        f"<html><head><title>{html.escape(title)}</title>\n"
+        '<link rel="stylesheet" type="text/css" href="static/site.css" />\n'
+        f"{_POSTBACK_SCRIPT}</head>\n"
+        f'<body>\n<img src="static/logo.png" alt="CAMS" />\n{form_open}{body}\n{form_close}\n</body></html>'
+    )
+
+
+class FakeCams:
+    """Threaded local CAMS site backed by an in-memory account table."""
+
+    def __init__(self, accounts=None, username="tester", password="secret", host="127.0.0.1", port=0,
+                 latency=0.0, jitter=0.0, asset_latency=0.0, failure_rate=0.0, seed=0):
+        self.accounts = accounts if accounts is not None else make_accounts(10)
+        self.username = username
+        self.password = password
+        self.latency = latency
+        self.jitter = jitter
+        self.asset_latency = asset_latency
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.requests = collections.Counter()
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.daemon_threads = True
+        self.server.cams = self
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def url(self):
+        """What CAMS_URL points at: the frameset that bounces to login when signed out."""
+        return f"{self.base_url}/cams.aspx"
+
+    def delay(self, page, can_fail=True):
+        """Sleep like a loaded server would; returns True when this request should fail."""
+        with self.lock:
+            self.requests[page] += 1
+            spread = self.rng.uniform(-self.jitter, self.jitter)
+            fail = self.rng.random() < self.failure_rate
+        if page.startswith("static/"):
+            pause = self.asset_latency
+        else:
+            pause = self.latency * (1 + spread)
+        if pause > 0:
+            time.sleep(pause)
+        return fail and can_fail
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="fake-cams", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self.thread is not None:
+            self.thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "Microsoft-IIS/8.5"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def cams(self):
+        return self.server.cams
+
+    # -- plumbing ---------------------------------------------------------
+
+    def _sid(self):
+        cookie = SimpleCookie(self.headers.get("Cookie", ""))
+        morsel = cookie.get(SESSION_COOKIE)
+        return morsel.value if morsel else None
+
+    def _session(self):
+        sid = self._sid()
+        with self.cams.lock:
+            return sid, self.cams.sessions.get(sid) if sid else None
+
+    def _send(self, body, status=200, headers=()):
+        payload = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in headers:
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _redirect(self, location, headers=()):
+        self._send(f'<html><body><a href="{location}">Object moved</a></body></html>', 302,
+                   [("Location", location), *headers])
+
+    def _form(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length).decode("utf-8")
+        return {key: values[-1] for key, values in parse_qs(raw, keep_blank_values=True).items()}
+
+    def _check_state(self, form, page, sid):
+        if form.get("__VIEWSTATE") != _state(page, sid) or form.get("__EVENTVALIDATION") != _state("ev/" + page, sid):
+            self._send(_page("Server Error", "<h2>Validation of viewstate MAC failed.</h2>"), 500)
+            return False
+        return True
+
+    def _page_name(self):
+        path = urlsplit(self.path).path.lstrip("/").lower()
+        if path.startswith("static/"):
+            return path
+        return path.rsplit("/", 1)[-1] or "cams.aspx"
+
+    def _slow(self, page, can_fail=True):
+        """Apply the configured latency; sends a 500 and returns True for an injected failure."""
+        if self.cams.delay(page, can_fail):
+            self._send(_page("Server Error", "<h2>Server Error in '/' Application.</h2>"), 500)
+            return True
+        return False
+
+    def _asset(self, page):
+        if page == "static/site.css":
+            payload, kind = _SITE_CSS.encode(), "text/css"
+        elif page == "static/logo.png":
+            payload, kind = _LOGO_PNG, "image/png"
+        else:
+            return self._send(_page("Not Found", "<h2>404</h2>"), 404)
+        self.send_response(200)
+        self.send_header("Content-Type", kind)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    # -- routing ----------------------------------------------------------
+
+    def do_GET(self):
+        page = self._page_name()
+        # Only account work fails; login and the empty search form stay up
+        # so sessions can always start.
+        if self._slow(page, can_fail=page in ("accountinfo.aspx", "accountcollateral.aspx")):
+            return
+        if page.startswith("static/"):
+            return self._asset(page)
+        if page == "login.aspx":
+            return self._login_form()
+        sid, session = self._session()
+        if session is None:
+            return self._redirect("login.aspx")
+        handler = {
+            "cams.aspx": self._frameset,
+            "menu.aspx": self._menu,
+            "search.aspx": self._search_form,
+            "accountinfo.aspx": self._account_page,
+            "accountcollateral.aspx": self._collateral_grid,
+        }.get(page)
+        if handler is None:
+            return self._send(_page("Not Found", "<h2>404</h2>"), 404)
+        handler(sid, session)
+
+    def do_POST(self):
+        page = self._page_name()
+        form = self._form()
+        if self._slow(page, can_fail=page != "login.aspx"):
+            return
+        if page == "login.aspx":
+            return self._login_submit(form)
+        sid, session = self._session()
+        if session is None:
+            return self._redirect("login.aspx")
+        if not self._check_state(form, page, sid):
+            return
+        if page == "search.aspx":
+            return self._search_submit(sid, session, form)
+        if page == "accountcollateral.aspx":
+            return self._collateral_detail(sid, session, form)
+        self._send(_page("Not Found", "<h2>404</h2>"), 404)
+
+    # -- pages ------------------------------------------------------------
+
+    def _login_form(self, message=""):
+        sid = self._sid() or secrets.token_hex(12)
+        body = (
+            f'<p class="msg">{message}</p>\n'
+            '<input name="LoginID" type="text" id="LoginID" />\n'
+            '<input name="txtPassword" type="password" id="txtPassword" />\n'
+            '<input type="submit" name="cmdLogin" value="Login" id="cmdLogin" />'
+        )
+        self._send(_page("CAMS Login", body, "login.aspx", sid),
+                   headers=[("Set-Cookie", f"{SESSION_COOKIE}={sid}; path=/; HttpOnly")])
+
+    def _login_submit(self, form):
+        sid = self._sid()
+        if not sid or not self._check_state(form, "login.aspx", sid):
+            return self._login_form("Your session has expired.")
+        if form.get("LoginID") != self.cams.username or form.get("txtPassword") != self.cams.password:
+            return self._login_form("Invalid user ID or password.")
+        with self.cams.lock:
+            self.cams.sessions[sid] = {"account": None}
+        body = (
+            "<p>Welcome. CAMS opens in a new window.</p>\n"
+            "<script>window.open('cams.aspx', '_blank');</script>"
+        )
+        self._send(_page("CAMS Login", body))
+
+    def _frameset(self, sid, session):
+        self._send(
+            "<html><head><title>CAMS</title></head>\n"
+            '<frameset rows="40,*">\n'
+            '<frame name="MenuFrame" src="menu.aspx" />\n'
+            '<frame name="SystemFrame" src="search.aspx" />\n'
+            "</frameset></html>"
+        )
+
+    def _menu(self, sid, session):
+        self._send(_page("Menu", '<a href="search.aspx" target="SystemFrame" id="lnkSearch">Search</a>'))
+
+    def _search_form(self, sid, session, results=""):
+        body = (
+            '<input name="_ctl0:ContentPlaceHolder1:txtSearch" type="text" id="_ctl0_ContentPlaceHolder1_txtSearch" />\n'
+            '<input type="submit" name="_ctl0:ContentPlaceHolder1:btnSearch" value="Search" '
+            'id="_ctl0_ContentPlaceHolder1_btnSearch" />\n'
+            f"{results}"
+        )
+        self._send(_page("Account Search", body, "search.aspx", sid))
+
+    def _search_submit(self, sid, session, form):
+        if form.get("__EVENTTARGET") == "gvResults":
+            acct = form.get("__EVENTARGUMENT", "").partition("$")[2]
+            if acct not in self.cams.accounts:
+                return self._send(_page("Server Error", "<h2>Unknown account.</h2>"), 500)
+            with self.cams.lock:
+                session["account"] = acct
+            return self._redirect("accountinfo.aspx")
+
+        term = form.get("_ctl0:ContentPlaceHolder1:txtSearch", "").strip()
+        account = self.cams.accounts.get(term)
+        if account is None:
+            results = '<span id="lblMessage">No records found.</span>'
+        else:
+            safe = html.escape(term)
+            results = (
+                '<table id="gvResults" border="1">\n'
+                "<tr><th>Account No</th><th>Name</th></tr>\n"
+                f"<tr onclick=\"__doPostBack('gvResults','Select${safe}')\" style=\"cursor:pointer\">"
+                f"<td>{safe}</td><td>{html.escape(account['ACCOUNT NAME'])}</td></tr>\n"
+                "</table>"
+            )
+        self._search_form(sid, session, results)
+
+    def _current_account(self, session):
+        return session.get("account"), self.cams.accounts.get(session.get("account"))
+
+    def _account_page(self, sid, session):
+        acct, account = self._current_account(session)
+        if account is None:
+            return self._redirect("search.aspx")
+        e = lambda key: html.escape(account[key])
+        popup = ""
+        if account["popup"]:
+            popup = (
+                '<div class="ui-dialog" id="dlgNotice"><p>This account has a remarks notice.</p>'
+                '<button type="button" class="ui-button" '
+                "onclick=\"document.getElementById('dlgNotice').style.display='none'\">OK</button></div>\n"
+            )
+        body = (
+            f"{popup}"
+            '<ul class="nav"><li class="dropdown">'
+            '<a href="#" class="dropdown-toggle" '
+            "onclick=\"var m=document.getElementById('mnuAccount');"
+            "m.style.display=m.style.display=='none'?'block':'none';return false;\">Account Details</a>\n"
+            '<ul id="mnuAccount" class="dropdown-menu" style="display:none">'
+            '<li><a href="accountcollateral.aspx">Collateral</a></li></ul></li></ul>\n'
+            f'<span id="lblACCTNO">{html.escape(acct)}</span>\n'
+            f'<span id="lblSHORTNAME">{e("ACCOUNT NAME")}</span>\n'
+            f'<span id="lblADDRESS">{e("PRIMARY ADDRESS")}</span>\n'
+            f'<span id="lblADDRESS2">{e("SECONDARY ADDRESS")}</span>\n'
+            f'<span id="lblOUT_BAL">{e("OB")}</span>\n'
+            f'<span id="lblAGESRC">{e("DPD")}</span>\n'
+            f'<input name="txtREM_STAT" type="text" value="{e("REM STAT")}" id="txtREM_STAT" readonly />\n'
+            f'<input name="txtMobile" type="text" value="{e("MOBILE #")}" id="txtMobile" readonly />'
+        )
+        self._send(_page("Account Information", body, "accountinfo.aspx", sid))
+
+    def _collateral_grid(self, sid, session):
+        acct, account = self._current_account(session)
+        if account is None:
+            return self._redirect("search.aspx")
+        rows = []
+        for n, unit in enumerate(account["units"], 2):
+            rows.append(
+                f'<tr><td><a id="dg__ctl{n}_DetailLink" '
+                f"href=\"javascript:__doPostBack('dg$_ctl{n}$DetailLink','')\">Detail</a></td>"
+                f"<td>{html.escape(unit['UNIT DESCRIPTION'])}</td></tr>"
+            )
+        body = '<table id="dg" border="1">\n<tr><th></th><th>Description</th></tr>\n' + "\n".join(rows) + "\n</table>"
+        self._send(_page("Account Collateral", body, "accountcollateral.aspx", sid))
+
+    def _collateral_detail(self, sid, session, form):
+        acct, account = self._current_account(session)
+        target = form.get("__EVENTTARGET", "")
+        try:
+            unit = account["units"][int(target.split("$")[1].replace("_ctl", "")) - 2]
+        except (TypeError, IndexError, ValueError):
+            return self._send(_page("Server Error", "<h2>Invalid postback target.</h2>"), 500)
+        e = lambda key: html.escape(unit[key])
+        body = (
+            f'<input name="txtColor_AUTO" type="text" value="{e("COLOR")}" id="txtColor_AUTO" />\n'
+            f'<input name="txtPlateNum_AUTO" type="text" value="{e("PLATE #")}" id="txtPlateNum_AUTO" />\n'
+            f'<input name="txtSerialNo_AUTO" type="text" value="{e("SERIAL #")}" id="txtSerialNo_AUTO" />\n'
+            f'<input name="txtEngineNo_AUTO" type="text" value="{e("ENGINE #")}" id="txtEngineNo_AUTO" />\n'
+            f'<input name="txtUnitDesc_AUTO" type="text" value="{e("UNIT DESCRIPTION")}" id="txtUnitDesc_AUTO" />\n'
+            '<a href="accountcollateral.aspx" id="lnkBack">Back</a>'
+        )
+        self._send(_page("Collateral Detail", body, "accountcollateral.aspx", sid))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a local fake CAMS site.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--accounts", type=int, default=10, help="number of synthetic accounts (default: 10)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--username", default="tester")
+    parser.add_argument("--password", default="secret")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every page (default: 0)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="+/- fraction of latency to vary by (default: 0)")
+    parser.add_argument("--asset-latency", type=float, default=0.0, help="seconds added to every CSS/image (default: 0)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of post-login pages answered with HTTP 500")
+    args = parser.parse_args(argv)
+
+    site = FakeCams(make_accounts(args.accounts, args.seed), args.username, args.password, args.host, args.port,
+                    latency=args.latency, jitter=args.jitter, asset_latency=args.asset_latency,
+                    failure_rate=args.failure_rate, seed=args.seed)
+    print(f"Fake CAMS listening on {site.url} (login {args.username} / {args.password})")
+    for acct in list(site.accounts)[:5]:
+        print(f"  sample account: {acct}")
+    try:
+        site.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        site.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
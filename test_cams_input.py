@@ -0,0 +1,94 @@
+"""AccountSource: input formats, header checks, deduplication and date parsing."""
+import datetime
+
+import openpyxl
+import pytest
+
+from cams_input import AccountSource, normalize_account, parse_date
+
+
+def write_csv(path, lines):
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_csv_dedups_and_counts(tmp_path):
+    path = write_csv(tmp_path / "accounts.csv", [
+        "Agent, Account  No ,Endo Date,New_Pullout_Date,Other",
+        "A1,001388051706749,03/05/2024,2024-03-07,x",
+        "A2, 001388051706749 ,,,x",
+        "A3,,,,x",
+        "A4,001388013255791,5-Mar-2024,not a date,x",
+        "A5,001388044712641,,not a date,x",
+    ])
+    source = AccountSource(path)
+    accounts = list(source)
+    assert accounts == [
+        ("001388051706749", {"AGENT": "A1", "ENDO DATE": "03/05/2024", "NEW_PULLOUT_DATE": "03/07/2024"}),
+        ("001388013255791", {"AGENT": "A4", "ENDO DATE": "03/05/2024", "NEW_PULLOUT_DATE": "not a date"}),
+        ("001388044712641", {"AGENT": "A5", "ENDO DATE": "", "NEW_PULLOUT_DATE": "not a date"}),
+    ]
+    assert source.rows == 5
+    assert source.accounts == 3
+    assert source.blank == 1
+    assert source.duplicates == {"001388051706749": 1}
+    # Both rows count, though the value was parsed once.
+    assert source.bad_dates == {"NEW_PULLOUT_DATE": 2}
+
+
+def test_xlsx_reads_serials_datetimes_and_numeric_accounts(tmp_path):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["ACCOUNT NO", "ENDO DATE", "NEW_PULLOUT_DATE"])
+    sheet.append([1388051706749, datetime.datetime(2024, 3, 5), 45356])
+    sheet.append(["001388013255791", 45356.0, None])
+    path = str(tmp_path / "accounts.xlsx")
+    workbook.save(path)
+
+    source = AccountSource(path)
+    assert list(source) == [
+        ("1388051706749", {"ENDO DATE": "03/05/2024", "NEW_PULLOUT_DATE": "03/05/2024"}),
+        ("001388013255791", {"ENDO DATE": "03/05/2024", "NEW_PULLOUT_DATE": ""}),
+    ]
+    assert source.numeric == 1
+
+
+def test_text_list_skips_comments_and_header(tmp_path):
+    path = write_csv(tmp_path / "accounts.txt", ["Account No", "# from the March batch", "001388051706749", "",
+                                                 "001388013255791"])
+    assert [acct for acct, _ in AccountSource(path)] == ["001388051706749", "001388013255791"]
+
+
+def test_missing_account_column_fails_on_open(tmp_path):
+    path = write_csv(tmp_path / "accounts.csv", ["Agent,Account", "A1,001388051706749"])
+    with pytest.raises(ValueError, match="no 'Account No' column"):
+        AccountSource(path)
+
+
+def test_unsupported_extension_fails_on_open(tmp_path):
+    with pytest.raises(ValueError, match="Unsupported input file type"):
+        AccountSource(str(tmp_path / "accounts.json"))
+
+
+@pytest.mark.parametrize("value, expected", [
+    (1388051706749.0, "1388051706749"),
+    (" 0013880 51706749 ", "001388051706749"),
+    (float("nan"), ""),
+    (None, ""),
+])
+def test_normalize_account(value, expected):
+    assert normalize_account(value) == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("03/05/2024", "03/05/2024"),
+    ("3/5/24", "03/05/2024"),
+    ("2024-03-05", "03/05/2024"),
+    ("Mar 5, 2024", "03/05/2024"),
+    (45356, "03/05/2024"),
+    (45356.5, "03/05/2024"),
+    (datetime.date(2024, 3, 5), "03/05/2024"),
+    ("someday", None),
+])
+def test_parse_date(value, expected):
+    assert parse_date(value) == expected
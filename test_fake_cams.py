@@ -0,0 +1,146 @@
+"""End-to-end runs of the HTTP backend against the local fake CAMS."""
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+import cams
+from cams_http import HttpSession
+from cams_lease import LeaseQueue
+from cams_pipeline import Pipeline
+from cams_retry import Pacer
+from fake_cams import FakeCams, make_accounts
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class ListSink:
+
+    def __init__(self):
+        self.records = []
+
+    def write(self, record):
+        self.records.append(record)
+
+    def close(self):
+        return None
+
+
+@pytest.fixture
+def site():
+    with FakeCams(make_accounts(6, popup_rate=.5, multi_unit_rate=.5)) as site:
+        yield site
+
+
+def http_session(site, **kw):
+    def factory(label="main"):
+        return HttpSession(label, url=site.url, username=site.username, password=site.password, **kw)
+    return factory
+
+
+def test_http_session_reads_an_account(site):
+    acct, expected = next(iter(site.accounts.items()))
+    session = http_session(site)().start()
+    try:
+        record = session.process_account(acct, {})
+    finally:
+        session.quit()
+    assert record["Status"] == cams.STATUS_SUCCESS
+    assert record["ACCOUNT NO"] == acct
+    assert record["ACCOUNT NAME"] == expected["ACCOUNT NAME"]
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_pipeline_writes_every_account_in_input_order(site, workers):
+    accounts = list(site.accounts) + ["000000000000000"]
+    sink = ListSink()
+    pipeline = Pipeline([(acct, {}) for acct in accounts], http_session(site), sinks=[sink], workers=workers)
+    pipeline.run()
+    assert [record["ACCOUNT NO"] for record in sink.records] == accounts
+    assert pipeline.statuses == {cams.STATUS_SUCCESS: len(site.accounts), cams.STATUS_NOT_FOUND: 1}
+
+
+def test_wrong_password_raises_session_error(site):
+    factory = lambda label="main": HttpSession(label, url=site.url, username=site.username, password="wrong")
+    with pytest.raises(cams.SessionError):
+        Pipeline([(acct, {}) for acct in site.accounts], factory).run()
+
+
+def test_cli_reports_a_rejected_login(site, tmp_path):
+    accounts = tmp_path / "accounts.txt"
+    accounts.write_text("\n".join(site.accounts))
+    env = dict(os.environ, CAMS_URL=site.url, USERLOGIN=site.username, PASSWORD="wrong")
+    result = subprocess.run(
+        [sys.executable, os.path.join(HERE, "cams.py"), "--backend", "http", "--input", str(accounts),
+         "--output", "csv", "--no-cache", "--no-session-reuse"],
+        cwd=tmp_path, env=env, capture_output=True, text=True, timeout=60,
+    )
+    assert result.returncode == 1, result.stderr
+    assert "Could not start a session" in result.stdout
+    assert "Traceback" not in result.stderr
+
+
+def test_queue_worker_retries_its_last_account(site, tmp_path):
+    # Each account fails once. On the last one the lease stream blocks until
+    # this worker completes it, so the retry must not wait on the stream.
+    failed = set()
+
+    class FlakySession(HttpSession):
+        def process_account(self, acct, manual):
+            if acct not in failed:
+                failed.add(acct)
+                return cams.failed_record(acct, cams.STATUS_ERROR, "flaky")
+            return super().process_account(acct, manual)
+
+    leases = LeaseQueue(str(tmp_path / "queue.sqlite3"))
+    leases.enqueue((acct, {}) for acct in site.accounts)
+    factory = lambda label="main": FlakySession(label, url=site.url, username=site.username, password=site.password)
+    pipeline = Pipeline(leases.stream("worker", poll=.1), factory, queue_size=1, pacer=Pacer(0, 0),
+                        on_result=lambda index, acct, data: leases.complete("worker", acct, data))
+    run = threading.Thread(target=pipeline.run, daemon=True)
+    run.start()
+    run.join(60)
+    assert not run.is_alive(), "worker hung on a retry"
+    assert leases.counts() == {"pending": 0, "leased": 0, "done": len(site.accounts), "failed": 0}
+    leases.close()
+
+
+def test_queue_worker_without_sessions_hands_its_leases_back(site, tmp_path):
+    # The session dies on its third account and cannot be restarted; the
+    # worker must stop leasing and return what it holds instead of hanging.
+    starts = []
+
+    class DyingSession(HttpSession):
+        def start(self):
+            starts.append(self.label)
+            if len(starts) > 1:
+                raise cams.SessionError("CAMS is down")
+            self.handled = 0
+            return super().start()
+
+        def process_account(self, acct, manual):
+            self.handled += 1
+            if self.handled == 3:
+                self.quit()
+                self.http = None
+                return cams.failed_record(acct, cams.STATUS_ERROR, "browser died")
+            return super().process_account(acct, manual)
+
+    leases = LeaseQueue(str(tmp_path / "queue.sqlite3"))
+    leases.enqueue((acct, {}) for acct in site.accounts)
+    factory = lambda label="main": DyingSession(label, url=site.url, username=site.username, password=site.password)
+    scraped = threading.Event()
+    pipeline = Pipeline(leases.stream("worker", poll=.1, stop=scraped), factory, queue_size=1, pacer=Pacer(0, 0),
+                        on_result=lambda index, acct, data: leases.complete("worker", acct, data),
+                        abandon=False, stop=scraped)
+    run = threading.Thread(target=pipeline.run, daemon=True)
+    run.start()
+    run.join(30)
+    assert not run.is_alive(), "worker kept leasing after its sessions were gone"
+    assert leases.release("worker") > 0
+    counts = leases.counts()
+    assert counts["done"] == 2 and counts["leased"] == 0 and counts["failed"] == 0
+    assert counts["pending"] == len(site.accounts) - 2
+    leases.close()